@@ -0,0 +1,303 @@
+"""
+CDNUpdates' headless batch scanner.
+
+This module allows checking whole source trees for CDN updates, without Sublime Text.
+It has to be run as a module of the package, from the directory containing it :
+
+    $ python -m CDNUpdates.CDNBatchScan --help
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+from .CDNContent import CDNContent
+from .CDNLoadTime import LOAD_TIMER
+from .CDNMetrics import METRICS
+from .CDNProviders import get_provider, get_provider_link_pattern, parse_url
+from .CDNResolver import Resolver
+from .CDNStreamScan import iter_links
+from .CDNUtils import HEADLESS_SETTINGS
+
+
+# Files with these extensions are scanned by default.
+DEFAULT_EXTENSIONS = (
+    'htm', 'html', 'xhtml', 'php', 'twig', 'jinja', 'j2', 'erb', 'ejs', 'hbs', 'mustache',
+    'liquid', 'njk', 'vue', 'svelte', 'jsx', 'tsx', 'js', 'css', 'md', 'jsp', 'aspx', 'cshtml'
+)
+
+# These directories are not walked through by default.
+DEFAULT_EXCLUDED_DIRECTORIES = ('.git', '.hg', '.svn', 'node_modules', 'bower_components')
+
+# Files bigger than this (in bytes) are memory-mapped and scanned by chunks.
+STREAM_SCAN_THRESHOLD = 32 * 1024 * 1024
+
+# The compiled links regular expression, lazily built within each process.
+_LINK_REGEXP_OBJECT = None
+
+
+def scan_file(path):
+    """
+    Returns the (line, column, url) tuples of the links served by known providers in `path`.
+    Lines and columns are 1-based.
+    This function is run by the workers of a pool (of processes, or threads within Sublime Text).
+    """
+    global _LINK_REGEXP_OBJECT  # pylint: disable=global-statement
+    if _LINK_REGEXP_OBJECT is None:
+        _LINK_REGEXP_OBJECT = re.compile(get_provider_link_pattern(), re.IGNORECASE)
+
+    try:
+        if os.path.getsize(path) >= STREAM_SCAN_THRESHOLD:
+            return path, [(line, column, url) for _, line, column, url in iter_links(path)]
+
+        with open(path, encoding='utf-8', errors='replace') as file:
+            text = file.read()
+    except OSError:
+        return path, []
+
+    links = []
+    line, line_start, last_position = 1, 0, 0
+    for match in _LINK_REGEXP_OBJECT.finditer(text):
+        newlines = text.count('\n', last_position, match.start())
+        if newlines:
+            line += newlines
+            line_start = text.rfind('\n', last_position, match.start()) + 1
+        last_position = match.start()
+
+        links.append((line, match.start() - line_start + 1, match.group(0)))
+
+    return path, links
+
+
+def iter_source_files(paths, extensions, excluded_directories):
+    """Yields the files (within `paths`) having one of `extensions`"""
+    suffixes = tuple('.' + extension.lstrip('.').lower() for extension in extensions)
+
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+
+        for directory, directories, files in os.walk(path):
+            directories[:] = [
+                directory_name for directory_name in directories
+                if directory_name not in excluded_directories
+            ]
+            for file_name in files:
+                if file_name.lower().endswith(suffixes):
+                    yield os.path.join(directory, file_name)
+
+
+def get_cdn_contents(path, links):
+    """Returns the `CDNContent` of `links` (as returned by `scan_file`) served by known providers"""
+    cdn_content_list = []
+    for line, column, url in links:
+        parsed_result = parse_url(url)
+        if get_provider(parsed_result.netloc) is not None:
+            cdn_content_list.append(CDNContent((path, line, column), parsed_result))
+
+    return cdn_content_list
+
+
+def resolve(cdn_content_list, wait_for_rate_limits=False):
+    """
+    Resolves the CDN of `cdn_content_list` through a single resolver.
+    If `wait_for_rate_limits` is set, deferred CDN are resolved again once quotas are reset.
+    """
+    resolver = Resolver()
+    deferred_cdn_content_list = resolver.resolve(cdn_content_list)
+
+    while deferred_cdn_content_list and wait_for_rate_limits:
+        delay = max(0, resolver.resume_at - time.time()) + 1
+        print(
+            "CDNUpdates : rate limit reached, waiting {0:.0f} seconds...".format(delay),
+            file=sys.stderr
+        )
+        time.sleep(delay)
+
+        for cdn_content in deferred_cdn_content_list:
+            cdn_content.status = None
+
+        resolver = Resolver()
+        deferred_cdn_content_list = resolver.resolve(deferred_cdn_content_list)
+
+
+def batch_scan(paths, jobs=None, extensions=DEFAULT_EXTENSIONS,
+               excluded_directories=DEFAULT_EXCLUDED_DIRECTORIES,
+               wait_for_rate_limits=False):
+    """
+    Scans (in a process pool) the files within `paths`, and checks the CDN found.
+    Every upstream lookup goes through a single resolver, so a library is only resolved once.
+    CDN deferred because of rate limits are left 'pending', unless `wait_for_rate_limits` is set.
+    Returns the list of `CDNContent`, whose `sublime_region` is a (path, line, column) tuple.
+    """
+    # Sublime Text loads this module too, so the multiprocessing machinery is only imported here.
+    from concurrent.futures import ProcessPoolExecutor  # pylint: disable=import-outside-toplevel
+
+    cdn_content_list = []
+    with METRICS.phase('links_scan'), ProcessPoolExecutor(max_workers=jobs) as executor:
+        for path, links in executor.map(
+                scan_file,
+                iter_source_files(paths, extensions, excluded_directories),
+                chunksize=64):
+            cdn_content_list.extend(get_cdn_contents(path, links))
+
+    with METRICS.phase('providers_parsing'):
+        for cdn_content in cdn_content_list:
+            cdn_content.handle_provider()
+
+    with METRICS.phase('resolution'):
+        resolve(cdn_content_list, wait_for_rate_limits)
+
+    return cdn_content_list
+
+
+def build_report(cdn_content_list):
+    """Returns a list of (JSON serializable) records describing each CDN"""
+    return [
+        {
+            'file': cdn_content.sublime_region[0],
+            'line': cdn_content.sublime_region[1],
+            'column': cdn_content.sublime_region[2],
+            'url': cdn_content.parsed_result.geturl(),
+            'name': cdn_content.name,
+            'version': cdn_content.version,
+            'latest_version': cdn_content.latest_version,
+            'status': cdn_content.status,
+            'https': cdn_content.parsed_result.scheme == 'https'
+        }
+        for cdn_content in cdn_content_list
+    ]
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        prog='python -m CDNUpdates.CDNBatchScan',
+        description="Checks CDN links of source trees for updates, and prints a JSON report."
+    )
+    parser.add_argument('paths', nargs='*', help="files or directories to scan")
+    parser.add_argument(
+        '-j', '--jobs', type=int,
+        help="number of scanning processes (defaults to the number of CPUs)"
+    )
+    parser.add_argument(
+        '-e', '--extensions', nargs='+', default=DEFAULT_EXTENSIONS,
+        help="extensions of the files to scan"
+    )
+    parser.add_argument(
+        '-x', '--exclude', nargs='+', default=DEFAULT_EXCLUDED_DIRECTORIES,
+        help="names of the directories not to walk through"
+    )
+    parser.add_argument(
+        '--github-api-token', default=os.environ.get('GITHUB_API_TOKEN', ''),
+        help="GitHub API token (defaults to `GITHUB_API_TOKEN` environment variable)"
+    )
+    parser.add_argument(
+        '--cache-ttl', type=int, default=3600,
+        help="number of seconds during which cached versions are re-used"
+    )
+    parser.add_argument(
+        '--request-timeout', type=float, default=10,
+        help="number of seconds a request may wait for an upstream API"
+    )
+    parser.add_argument(
+        '--timeout', type=float, default=0,
+        help="number of seconds the whole resolution may last (CDN left are timed out)"
+    )
+    parser.add_argument(
+        '--format', choices=('json', 'jsonl'), default='json',
+        help="format of the report printed on standard output"
+    )
+    parser.add_argument(
+        '--fail-on-outdated', action='store_true',
+        help="exit with status 1 if any CDN is to update"
+    )
+    parser.add_argument(
+        '--wait-for-rate-limits', action='store_true',
+        help="wait for rate limits to be reset, instead of leaving CDN pending"
+    )
+    parser.add_argument(
+        '--metrics', metavar='FILE',
+        help="dump measures (phases durations, requests, cache usage) as JSON to FILE"
+    )
+    parser.add_argument(
+        '--offline', action='store_true',
+        help="do not send any request, only use the cache and the snapshot"
+    )
+    parser.add_argument(
+        '--snapshot', metavar='FILE',
+        help="path of the snapshot file (defaults to the one within the cache directory)"
+    )
+    parser.add_argument(
+        '--refresh-snapshot', action='store_true',
+        help="fetch the latest version of every known library into the snapshot, and exit"
+    )
+    parser.add_argument('--debug', action='store_true', help="log debug messages on stderr")
+    args = parser.parse_args(argv)
+
+    HEADLESS_SETTINGS.update({
+        'debug': args.debug,
+        'github_api_token': args.github_api_token,
+        'cache_ttl': args.cache_ttl,
+        'request_timeout': args.request_timeout,
+        'check_timeout': args.timeout,
+        'offline': args.offline,
+        'snapshot_path': args.snapshot or ''
+    })
+
+    if args.refresh_snapshot:
+        from .CDNSnapshot import refresh_snapshot  # pylint: disable=import-outside-toplevel
+
+        nb_versions, nb_failures, snapshot_size = refresh_snapshot()
+        print(
+            "CDNUpdates : {0} versions retrieved, {1} failed, {2} in the snapshot.".format(
+                nb_versions, nb_failures, snapshot_size
+            ),
+            file=sys.stderr
+        )
+        return 1 if nb_failures and not nb_versions else 0
+
+    if not args.paths:
+        parser.error("the following arguments are required: paths")
+
+    report = build_report(batch_scan(
+        args.paths, args.jobs, args.extensions, args.exclude, args.wait_for_rate_limits
+    ))
+
+    if args.format == 'jsonl':
+        for record in report:
+            print(json.dumps(record))
+    else:
+        print(json.dumps(report, indent=2))
+
+    statuses = [record['status'] for record in report]
+    print(
+        "CDNUpdates : {0} CDN up to date, {1} to update, {2} not found, {3} pending, "
+        "{4} timed out ({5} not loaded over HTTPS).".format(
+            statuses.count('up_to_date'),
+            statuses.count('to_update'),
+            statuses.count('not_found'),
+            statuses.count('pending'),
+            statuses.count('timed_out'),
+            len([record for record in report if not record['https']])
+        ),
+        file=sys.stderr
+    )
+
+    print("CDNUpdates : {0}.".format(METRICS.summary()), file=sys.stderr)
+    if args.metrics:
+        METRICS.dump(args.metrics)
+
+    return 1 if args.fail_on_outdated and 'to_update' in statuses else 0
+
+
+LOAD_TIMER.module_loaded(__name__)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
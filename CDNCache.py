@@ -0,0 +1,123 @@
+"""CDNUpdates' persistent cache of upstream versions"""
+
+import json
+import os
+import time
+from threading import Lock
+
+from .CDNLoadTime import LOAD_TIMER
+from .CDNUtils import get_cache_path, log_message
+
+
+class VersionCache:
+    """
+    This class stores on disk (JSON) the latest versions retrieved upstream.
+    Entries are keyed by provider ('cdnjs', 'github_tag', ...) and identity ('twbs/bootstrap', ...).
+    """
+
+    def __init__(self, file_name='versions.json'):
+        self.file_name = file_name
+
+        # Entries are lazily loaded from disk, on first access.
+        self._entries = None
+        self._dirty = False
+        self._lock = Lock()
+
+    @property
+    def file_path(self):
+        """Path to the cache file, within Sublime's cache directory"""
+        return os.path.join(get_cache_path(), self.file_name)
+
+    @staticmethod
+    def _key(provider, identity):
+        return "{0}:{1}".format(provider, identity)
+
+    def _load(self):
+        """Reads the cache file, if not already done (the lock must be held)"""
+        if self._entries is not None:
+            return
+
+        try:
+            with open(self.file_path, encoding='utf-8') as file:
+                self._entries = json.load(file)
+        except (OSError, ValueError):
+            # Missing or corrupted file, we just start over.
+            self._entries = {}
+
+    def get(self, provider, identity, ttl):
+        """Returns the cached version of `identity` if it is not older than `ttl` seconds"""
+        entry = self.get_entry(provider, identity)
+        if entry is None or time.time() - entry['fetched_at'] > ttl:
+            return None
+
+        return entry['version']
+
+    def get_entry(self, provider, identity):
+        """Returns the raw entry stored for `identity` (even expired), or `None`"""
+        with self._lock:
+            self._load()
+            return self._entries.get(self._key(provider, identity))
+
+    def get_lookups(self):
+        """Returns the (provider, identity) tuples of every entry holding a version"""
+        with self._lock:
+            self._load()
+            return [
+                tuple(key.split(':', 1)) for key, entry in self._entries.items()
+                if entry['version'] is not None
+            ]
+
+    def _update_entry(self, provider, identity, **fields):
+        """Updates (or creates) the entry of `identity` with `fields`"""
+        with self._lock:
+            self._load()
+            self._entries.setdefault(
+                self._key(provider, identity),
+                {'version': None, 'fetched_at': 0}
+            ).update(fields)
+            self._dirty = True
+
+    def set(self, provider, identity, version):
+        """Stores `version` as the latest version of `identity`"""
+        self._update_entry(provider, identity, version=version, fetched_at=time.time())
+
+    def set_validators(self, provider, identity, etag=None, last_modified=None):
+        """
+        Stores the HTTP validators (`ETag` / `Last-Modified`) of the upstream response...
+        ... which gave the latest version of `identity`, for future conditional requests.
+        """
+        self._update_entry(provider, identity, etag=etag, last_modified=last_modified)
+
+    def save(self):
+        """Writes the cache file on disk, if it has been modified"""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            try:
+                os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+                with open(self.file_path, 'w', encoding='utf-8') as file:
+                    json.dump(self._entries, file)
+            except OSError as error:
+                log_message("Could not write the cache file ({0}).".format(error))
+                return
+
+            self._dirty = False
+
+    def invalidate(self):
+        """Drops every entry, in memory and on disk"""
+        with self._lock:
+            self._entries = {}
+            self._dirty = False
+
+            try:
+                os.remove(self.file_path)
+            except OSError:
+                pass
+
+
+# This cache is shared by every check, and persists across command runs.
+VERSION_CACHE = VersionCache()
+
+
+LOAD_TIMER.module_loaded(__name__)
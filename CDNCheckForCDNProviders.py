@@ -1,9 +1,10 @@
 """CDNUpdates' CDN providers verification"""
 
-from urllib.parse import urlparse
+from sublime import Region
 
 from .CDNContent import CDNContent
-from .CDNConstants import CDN_PROVIDERS
+from .CDNLoadTime import LOAD_TIMER
+from .CDNProviders import get_provider, parse_url
 from .CDNUtils import log_message
 
 
@@ -18,12 +19,20 @@ class CheckForCDNProviders:  # pylint: disable=too-few-public-methods
         self.cdn_content_list = cdn_content_list
         self.region_list = region_list
 
+        if not self.region_list:
+            return
+
+        # The buffer is read once (from the first link to the last one), links are sliced locally.
+        begin = min(region.begin() for region in self.region_list)
+        end = max(region.end() for region in self.region_list)
+        text = self.view.substr(Region(begin, end))
+
         for region in self.region_list:
             # We parse the URL taken from that region...
-            parsed_result = urlparse(self.view.substr(region))
+            parsed_result = parse_url(text[region.begin() - begin:region.end() - begin])
 
             # ... to check if it's a known CDN provider.
-            if parsed_result.netloc in CDN_PROVIDERS:
+            if get_provider(parsed_result.netloc) is not None:
                 # If this matches, we store it and move on to the next element.
                 self.cdn_content_list.append(CDNContent(region, parsed_result))
 
@@ -34,3 +43,6 @@ class CheckForCDNProviders:  # pylint: disable=too-few-public-methods
                         parsed_result.netloc
                     )
                 )
+
+
+LOAD_TIMER.module_loaded(__name__)
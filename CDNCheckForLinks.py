@@ -1,8 +1,12 @@
 """CDNUpdates' links finder"""
 
-from sublime import IGNORECASE
+import re
+
+from sublime import IGNORECASE, Region, load_settings
 
 from .CDNConstants import LINK_REGEXP_PATTERN
+from .CDNLoadTime import LOAD_TIMER
+from .CDNProviders import get_provider_link_pattern
 
 
 class CheckForLinks:  # pylint: disable=too-few-public-methods
@@ -10,11 +14,36 @@ class CheckForLinks:  # pylint: disable=too-few-public-methods
     A simple class to gather the links present within the view.
     """
 
-    def __init__(self, view, region_list):
-        """This method gathers URLs present within the sheet calling this plugin"""
+    def __init__(self, view, region_list, within=None):
+        """
+        This method gathers URLs present within the sheet calling this plugin.
+        If `within` (a list of regions) is passed, only these parts of the sheet are scanned.
+        """
         self.view = view
         self.region_list = region_list
 
-        for region in self.view.find_all(LINK_REGEXP_PATTERN, IGNORECASE):
-            # We have to fill the list directly (passed by reference)
-            self.region_list.append(region)
+        # By default, we only look for the hosts of known providers (which is much faster).
+        # The "full" mode runs the general (and expensive) links regular expression.
+        if load_settings('CDNUpdates.sublime-settings').get('link_scan_mode') == 'full':
+            pattern = LINK_REGEXP_PATTERN
+        else:
+            pattern = get_provider_link_pattern()
+
+        if within is None:
+            for region in self.view.find_all(pattern, IGNORECASE):
+                # We have to fill the list directly (passed by reference)
+                self.region_list.append(region)
+
+        else:
+            for scanned_region in within:
+                self._find_within(pattern, scanned_region)
+
+    def _find_within(self, pattern, scanned_region):
+        """Gathers URLs matching `pattern` located within `scanned_region`"""
+        # Only this part of the buffer is read, and matched on our side.
+        offset = scanned_region.begin()
+        for match in re.finditer(pattern, self.view.substr(scanned_region), re.IGNORECASE):
+            self.region_list.append(Region(offset + match.start(), offset + match.end()))
+
+
+LOAD_TIMER.module_loaded(__name__)
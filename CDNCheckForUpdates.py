@@ -1,139 +1,132 @@
 """CDNUpdates' update verification entry point"""
 
 import os
-from threading import Thread
-from urllib.error import HTTPError
+import time
+from threading import Lock
 
 from sublime import (
-    DRAW_EMPTY_AS_OVERWRITE,
-    DRAW_NO_FILL,
-    DRAW_NO_OUTLINE,
-    DRAW_SOLID_UNDERLINE,
-    LAYOUT_BLOCK,
-    message_dialog
+    load_settings,
+    message_dialog,
+    set_timeout,
+    set_timeout_async,
+    status_message
 )
 
-from .CDNUtils import log_message
+from .CDNLoadTime import LOAD_TIMER
+from .CDNMetrics import METRICS
+from .CDNResolver import Resolver
+from .CDNUtils import get_cache_path, log_message
+from .CDNViewState import get_view_state
+from .CDNWorkerPool import run_in_background
 
 
-class CheckForUpdates(Thread):
+# Results are drawn by frames (milliseconds) : lookups done meanwhile are drawn all at once.
+FRAME_DURATION = 16
+
+
+class CheckForUpdates:  # pylint: disable=too-many-instance-attributes
     """This class run asynchronously the CDNs version checking upstream."""
 
-    def __init__(self, view, cdn_content_list):
+    def __init__(  # pylint: disable=too-many-arguments
+            self, view, cdn_content_list, pending_cdn_content_list=None, is_cancelled=None,
+            is_automatic=False):
         self.view = view
         self.cdn_content_list = cdn_content_list
 
-        # Threading initialization.
-        Thread.__init__(self)
+        # Only these CDN have to be checked (others come from a previous scan).
+        self.pending_cdn_content_list = pending_cdn_content_list \
+            if pending_cdn_content_list is not None else cdn_content_list
+
+        # This callable tells whether this check has been superseded by a newer one.
+        self.is_cancelled = is_cancelled or (lambda: False)
+
+        # Whether this check resumes lookups previously deferred (because of rate limits)...
+        self.is_resumed = False
+        # ... and whether it has been run by `auto_check` (not by the user).
+        self.is_automatic = is_automatic
+
+        # Elements are only drawn again where results changed (see `CDNRenderer.py`).
+        self.renderer = get_view_state(view).renderer
+
+        # Whether a frame is already planned (lookups may be done by several workers).
+        self._is_frame_scheduled = False
+        self._lock = Lock()
+
+    def start(self):
+        """Queues this check on the background worker, not to "freeze" the UI"""
+        run_in_background(self.run)
 
     def run(self):
+        """Checks pending CDN upstream, and renders the results of all of them"""
+        if self.is_cancelled():
+            return
+
         # See `CDNContent.py:handle_provider()` to check what is done.
-        for cdn_content in self.cdn_content_list:
-            try:
-                cdn_content.handle_provider()
-
-            except HTTPError as error:
-                # Let's log an error there for the user (if `debug` is `true`).
-                log_message(
-                    "An error occurred for \"{0}\" ({1}).".format(
-                        cdn_content.parsed_result.geturl(),
-                        error.reason
-                    )
+        # CDN whose lookup has already been planned (deferred ones) are not parsed again.
+        with METRICS.phase('providers_parsing'):
+            for cdn_content in self.pending_cdn_content_list:
+                if cdn_content.lookup is None and cdn_content.status is None:
+                    cdn_content.handle_provider()
+
+        # CDN whose status is already known (previous scan, or without any lookup) are drawn...
+        # ... on the first frame, the others as soon as their lookup is done.
+        self.schedule_frame()
+
+        # Upstream lookups are coalesced and run concurrently, the visible ones first...
+        # ... until the deadline of this check : results known by then are drawn anyway.
+        visible_region = self.view.visible_region()
+        resolver = Resolver(self.is_cancelled)
+        with METRICS.phase('resolution'):
+            deferred_cdn_content_list = resolver.resolve(
+                self.pending_cdn_content_list,
+                on_resolved=lambda _: self.schedule_frame(),
+                is_prioritized=lambda cdn_content: cdn_content.sublime_region.intersects(
+                    visible_region
                 )
+            )
 
-                # But we'll display a red icon anyway...
-                cdn_content.status = 'not_found'
-
-            # If this CDN represents a problem "that has to be fixed"...
-            if cdn_content.status == 'to_update':
-                # ... let's scroll directly to its location.
-                self.view.show(cdn_content.sublime_region)
-
-                # If the CDN is to update and we retrieved a newer version...
-                # ...let's set a "Phantom" with an interesting content 😉
-                if cdn_content.latest_version:
-                    self.view.add_phantom(
-                        'latest_versions',
-                        cdn_content.sublime_region,
-                        """
-                            <body id="CDN-new_version">
-                                <style>
-                                    div.new_version {{
-                                        background-color: var(--bluish);
-                                        color: black;
-                                        padding: 10px;
-                                    }}
-                                </style>
-                                <div class="new_version">
-                                    New version for {0} found : <b>{1}</b>
-                                </div>
-                            </body>
-                        """.format(cdn_content.name, cdn_content.latest_version),
-                        LAYOUT_BLOCK
-                    )
-
-                # Let's inform the user he should specify version for this CDN.
-                else:
-                    self.view.add_phantom(
-                        'specify_versions',
-                        cdn_content.sublime_region,
-                        """
-                            <body id="CDN-no_version_found">
-                                <style>
-                                    div.no_version_found {{
-                                        background-color: var(--orangish);
-                                        color: black;
-                                        padding: 10px;
-                                    }}
-                                </style>
-                                <div class="no_version_found">
-                                    You should specify a version for <b>{}</b>.
-                                </div>
-                            </body>
-                        """.format(
-                            cdn_content.parsed_result.path.rpartition('/')[2]
-                        ),
-                        LAYOUT_BLOCK
-                    )
-
-            # Security measures !
-            # If this resource is not loaded over HTTPS, we add a warning !
-            if cdn_content.parsed_result.scheme != 'https':
-                self.view.add_phantom(
-                    'specify_https',
-                    cdn_content.sublime_region,
-                    """
-                        <body id="CDN-https_warning">
-                            <style>
-                                div.https_warning {{
-                                    background-color: var(--redish);
-                                    color: black;
-                                    padding: 10px;
-                                }}
-                            </style>
-                            <div class="https_warning">
-                                You should explicitly load <b>{0}</b> over HTTPS !
-                            </div>
-                        </body>
-                    """.format(
-                        cdn_content.name or
-                        cdn_content.parsed_result.path.rpartition('/')[2]
-                    ),
-                    LAYOUT_BLOCK
-                )
+        # The last results are drawn with the report, on the main thread.
+        set_timeout(
+            lambda: self.report(deferred_cdn_content_list, resolver.resume_at),
+            FRAME_DURATION
+        )
 
-        # Let's add some regions for the user with specific icons.
-        # This is done afterwards to reduce the number of regions drawn.
-        for status in ('up_to_date', 'to_update', 'not_found'):
-            self.view.add_regions(
-                status,
-                [cdn_content.sublime_region for cdn_content in self.cdn_content_list
-                 if cdn_content.status == status],
-                'text',
-                "Packages/CDNUpdates/Icons/{0}.png".format(status),
-                DRAW_EMPTY_AS_OVERWRITE | DRAW_NO_FILL | DRAW_NO_OUTLINE |
-                DRAW_SOLID_UNDERLINE
-            )
+    def report(self, deferred_cdn_content_list, resume_at):
+        """Draws the last results, and reports this check to the user (on the main thread)"""
+        # A newer check will render its own results.
+        if self.is_cancelled() or not self.view.is_valid():
+            return
+
+        self.draw()
+
+        self.report_metrics()
+
+        # Lookups deferred because of a rate limit are run again once their quota is reset.
+        if deferred_cdn_content_list:
+            self.schedule_resume(deferred_cdn_content_list, resume_at)
+
+        # Resumed checks only report the deferred CDN they checked, in the status bar...
+        if self.is_resumed:
+            status_message("CDNUpdates : {0} deferred CDN checked, {1} still pending.".format(
+                len(self.pending_cdn_content_list),
+                len(deferred_cdn_content_list)
+            ))
+            return
+
+        # ... as automatic checks do (a dialog on each opening or saving would be a nuisance).
+        if self.is_automatic:
+            status_message("CDNUpdates : {0} CDN up to date, {1} to update, {2} not found.".format(
+                len([i for i in self.cdn_content_list
+                     if i.status == 'up_to_date']),
+                len([i for i in self.cdn_content_list
+                     if i.status == 'to_update']),
+                len([i for i in self.cdn_content_list
+                     if i.status == 'not_found'])
+            ))
+            return
+
+        # CDN whose lookup could not be done in time are checked again on next run.
+        nb_timed_out = len([i for i in self.cdn_content_list if i.status == 'timed_out'])
 
         # Let's make appear a message dialog with a report for the user.
         message_dialog(
@@ -141,7 +134,7 @@ class CheckForUpdates(Thread):
             "• {1} CDN already up to date.{0}"
             "• {2} CDN to update.{0}"
             "• {3} CDN not found.{0}"
-            "• {4} CDN not loaded over HTTPS.".format(
+            "• {4} CDN not loaded over HTTPS.{5}{6}".format(
                 os.linesep,
                 len([i for i in self.cdn_content_list
                      if i.status == 'up_to_date']),
@@ -150,6 +143,83 @@ class CheckForUpdates(Thread):
                 len([i for i in self.cdn_content_list
                      if i.status == 'not_found']),
                 len([i for i in self.cdn_content_list
-                     if i.parsed_result.scheme != 'https'])
+                     if i.parsed_result.scheme != 'https']),
+                "{0}• {1} CDN pending (rate limit reached, they will be checked later).".format(
+                    os.linesep,
+                    len(deferred_cdn_content_list)
+                ) if deferred_cdn_content_list else '',
+                "{0}• {1} CDN timed out (they will be checked again on next run).".format(
+                    os.linesep,
+                    nb_timed_out
+                ) if nb_timed_out else ''
             )
         )
+
+    def schedule_resume(self, deferred_cdn_content_list, resume_at):
+        """Schedules a new check of `deferred_cdn_content_list`, after `resume_at` (epoch)"""
+        def resume():
+            if self.is_cancelled() or not self.view.is_valid():
+                return
+
+            for cdn_content in deferred_cdn_content_list:
+                cdn_content.status = None
+
+            check_for_updates = CheckForUpdates(
+                self.view,
+                self.cdn_content_list,
+                deferred_cdn_content_list,
+                self.is_cancelled,
+                self.is_automatic
+            )
+            check_for_updates.is_resumed = True
+            check_for_updates.start()
+
+        # A second of margin, as clocks of upstream APIs may not be perfectly synchronized.
+        delay = max(0, resume_at - time.time()) + 1
+        log_message("{0} deferred CDN will be checked again in {1:.0f} seconds.".format(
+            len(deferred_cdn_content_list),
+            delay
+        ))
+        set_timeout_async(resume, int(delay * 1000))
+
+    def schedule_frame(self):
+        """Plans the drawing of a frame, unless one is already planned (from any thread)"""
+        with self._lock:
+            if self._is_frame_scheduled:
+                return
+            self._is_frame_scheduled = True
+
+        set_timeout(self.draw_frame, FRAME_DURATION)
+
+    def draw_frame(self):
+        """Draws a frame (on the main thread), unless this check has been superseded"""
+        if self.is_cancelled() or not self.view.is_valid():
+            return
+
+        self.draw()
+
+    def draw(self):
+        """Draws (the changes of) every CDN result known so far"""
+        with self._lock:
+            self._is_frame_scheduled = False
+
+        with METRICS.phase('rendering'):
+            self.renderer.update(self.cdn_content_list)
+
+    @staticmethod
+    def report_metrics():
+        """Logs a summary of the measures of this check (and exposes them, if enabled)"""
+        log_message("Metrics : {0}".format(METRICS.summary()))
+
+        if not load_settings('CDNUpdates.sublime-settings').get('metrics', False):
+            return
+
+        status_message("CDNUpdates : {0}".format(METRICS.summary()))
+        try:
+            os.makedirs(get_cache_path(), exist_ok=True)
+            METRICS.dump(os.path.join(get_cache_path(), 'metrics.json'))
+        except OSError as error:
+            log_message("Could not write the metrics file ({0}).".format(error))
+
+
+LOAD_TIMER.module_loaded(__name__)
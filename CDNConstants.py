@@ -1,40 +1,25 @@
 """CDNUpdates' constants module"""
 
-import re
+from .CDNLoadTime import LOAD_TIMER
 
 
 # pylint: disable=line-too-long
 # This Semver regular expression has been written by @sindresorhus for NodeJS.
 # It has been adapted to remove the starting non-fixed width look-behind (incompatible) and trailing positive look-ahead (useless here).
 # <https://github.com/sindresorhus/semver-regex> (v3.1.1)
-SEMVER_REGEXP_OBJECT = re.compile(
-    r"v?(?:0|[1-9]\d*)\.(?:0|[1-9]\d*)\.(?:0|[1-9]\d*)(?:-(?:0|[1-9]\d*|[\da-z-]*[a-z-][\da-z-]*)(?:\.(?:0|[1-9]\d*|[\da-z-]*[a-z-][\da-z-]*))*)?(?:\+[\da-z-]+(?:\.[\da-z-]+)*)?",
-    re.IGNORECASE
-)
+# It's compiled on first use (see `CDNSemver.search_semver()`), not when Sublime Text loads the plugin.
+SEMVER_REGEXP_PATTERN = r"v?(?:0|[1-9]\d*)\.(?:0|[1-9]\d*)\.(?:0|[1-9]\d*)(?:-(?:0|[1-9]\d*|[\da-z-]*[a-z-][\da-z-]*)(?:\.(?:0|[1-9]\d*|[\da-z-]*[a-z-][\da-z-]*))*)?(?:\+[\da-z-]+(?:\.[\da-z-]+)*)?"
 
 # This is a regular expression written by @diegoperini, and ported for Python by @adamrofer.
 # <https://gist.github.com/dperini/729294>
 # It has been tweaked to work with network path references and HTML tags.
 LINK_REGEXP_PATTERN = r"(?:(https?:)?//)(?:\S+(?::\S*)?@)?(?:(?!(?:10|127)(?:\.\d{1,3}){3})(?!(?:169\.254|192\.168)(?:\.\d{1,3}){2})(?!172\.(?:1[6-9]|2\d|3[0-1])(?:\.\d{1,3}){2})(?:[1-9]\d?|1\d\d|2[01]\d|22[0-3])(?:\.(?:1?\d{1,2}|2[0-4]\d|25[0-5])){2}(?:\.(?:[1-9]\d?|1\d\d|2[0-4]\d|25[0-4]))|(?:(?:[a-z\u00a1-\uffff0-9]-?)*[a-z\u00a1-\uffff0-9]+)(?:\.(?:[a-z\u00a1-\uffff0-9]-?)*[a-z\u00a1-\uffff0-9]+)*(?:\.(?:[a-z\u00a1-\uffff]{2,})))(?::\d{2,5})?(?:[/?#]\S[^\"\s]*)?"
-# pylint: enable=line-too-long
 
-# This list stores the API links of handled CDN providers.
-CDN_PROVIDERS = [
-    'cdnjs.cloudflare.com',
-    'maxcdn.bootstrapcdn.com',
-    'code.jquery.com',
-    'ajax.googleapis.com',
-    'cdn.jsdelivr.net',
-    'rawgit.com',
-    'cdn.rawgit.com',
-    'code.ionicframework.com',
-    'use.fontawesome.com',
-    'opensource.keycdn.com',
-    'cdn.staticfile.org',
-    'ajax.microsoft.com',
-    'ajax.aspnetcdn.com',
-    'cdn.ckeditor.com'
-]
+# This is a lighter regular expression, only matching links served by known CDN providers.
+# `{hosts}` is to be replaced by an alternation of (escaped) hosts, as given by the providers registry.
+# The host must be followed by a port, a path, a query, a fragment or the end of the link.
+PROVIDER_LINK_REGEXP_TEMPLATE = r"(?:https?:)?//(?:{hosts})(?=[:/?#\"'\s<>]|$)(?::\d{{2,5}})?(?:[/?#]\S[^\"\s]*)?"
+# pylint: enable=line-too-long
 
 # The dictionaries below will store the "correspondences" between project names and...
 # ... GitHub repositories identities (owner / name).
@@ -227,3 +212,6 @@ AJAX_MICROSOFT_CORRESPONDENCES = {
         'name': 'SignalR'
     }
 }
+
+
+LOAD_TIMER.module_loaded(__name__)
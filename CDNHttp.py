@@ -0,0 +1,305 @@
+"""CDNUpdates' HTTP client, keeping connections alive"""
+
+import socket
+import time
+from base64 import b64encode
+from contextlib import contextmanager
+from threading import Lock, Timer, local
+from urllib.error import HTTPError, URLError
+from urllib.parse import unquote, urljoin, urlsplit
+
+from .CDNLoadTime import LOAD_TIMER
+from .CDNMetrics import get_metrics
+from .CDNRateLimits import RATE_LIMITS, RateLimitError
+from .CDNWorkerPool import HOST_LIMITER
+
+
+# Redirections (as repositories moved on GitHub) are followed, as `urlopen` did.
+REDIRECTION_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTIONS = 5
+
+
+def _get_http_client():
+    """
+    Returns the `http.client` module.
+    The network stack (`http.client`, `ssl`, `email`...) is heavy to import...
+    ... so it's only loaded on first request, and not when Sublime Text loads the plugin.
+    """
+    import http.client  # pylint: disable=import-outside-toplevel
+    return http.client
+
+
+def _get_proxies():
+    """
+    Returns the proxies configured (scheme -> proxy URL), and a function telling if a host...
+    ... bypasses them, as `urlopen` does (`HTTP(S)_PROXY` and `NO_PROXY` or system settings).
+    """
+    from urllib.request import getproxies, proxy_bypass  # pylint: disable=import-outside-toplevel
+    return getproxies(), proxy_bypass
+
+
+class RequestTimeoutError(URLError):
+    """Raised when a request did not complete in time (or could not be sent before the deadline)"""
+
+
+class Response:
+    """A fully read HTTP response, exposing the same interface as `urlopen` results"""
+
+    def __init__(self, url, status, headers, body):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def getcode(self):
+        """Returns the HTTP status code of the response"""
+        return self.status
+
+    def geturl(self):
+        """Returns the URL the response comes from (after redirections)"""
+        return self.url
+
+    def read(self):
+        """Returns the payload of the response"""
+        return self.body
+
+
+class ConnectionPool:
+    """
+    This class keeps persistent (keep-alive) connections to remote hosts.
+    They are re-used across lookups and command runs, and closed once idle for too long.
+    Proxies are honoured as by `urlopen` : HTTPS requests are tunnelled through them.
+    """
+
+    def __init__(self, max_idle_time=60, request_timeout=10):
+        self.max_idle_time = max_idle_time
+        # Maximum number of seconds a request may wait for the remote host (on each operation).
+        self.request_timeout = request_timeout
+
+        # Deadline (`time.time()`) of the requests sent by each thread, if any.
+        self._thread_state = local()
+
+        # (scheme, netloc) -> [(connection, time of last usage), ...]
+        self._idle_connections = {}
+        # Closes idle connections in background, while some are left.
+        self._eviction_timer = None
+        self._lock = Lock()
+
+    @contextmanager
+    def deadline(self, deadline):
+        """Requests sent by this thread within the `with` block have to complete by `deadline`"""
+        self._thread_state.deadline = deadline
+        try:
+            yield
+        finally:
+            self._thread_state.deadline = None
+
+    def _get_timeout(self):
+        """Returns the timeout of the next request (bounded by the deadline of this thread)"""
+        timeout = self.request_timeout
+        deadline = getattr(self._thread_state, 'deadline', None)
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.time())
+
+        if timeout <= 0:
+            raise RequestTimeoutError("The deadline of this check has been reached")
+
+        return timeout
+
+    def _acquire(self, scheme, netloc, timeout):
+        """Returns an idle connection to `netloc` if any, or a brand new one"""
+        with self._lock:
+            self._evict_idle_connections()
+
+            idle_connections = self._idle_connections.get((scheme, netloc))
+            if idle_connections:
+                connection = idle_connections.pop()[0]
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+
+        return self._connect(scheme, netloc, timeout), False
+
+    @staticmethod
+    def _connect(scheme, netloc, timeout):
+        """
+        Returns a new connection to `netloc`, or to the proxy requests to `netloc` go through.
+        Requests sent over a proxied HTTP connection need its `forward_proxy_headers`.
+        """
+        http_client = _get_http_client()
+        connection_class = http_client.HTTPSConnection if scheme == 'https' else \
+            http_client.HTTPConnection
+
+        proxies, proxy_bypass = _get_proxies()
+        proxy = proxies.get(scheme)
+        if not proxy or proxy_bypass(netloc):
+            return connection_class(netloc, timeout=timeout)
+
+        proxy = urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+        proxy_headers = {}
+        if proxy.username is not None:
+            proxy_headers['Proxy-Authorization'] = "Basic {0}".format(b64encode("{0}:{1}".format(
+                unquote(proxy.username), unquote(proxy.password or '')
+            ).encode()).decode())
+
+        # Credentials are sent in headers, not in the address of the proxy.
+        connection = connection_class(proxy.netloc.rpartition('@')[2], timeout=timeout)
+        if scheme == 'https':
+            connection.set_tunnel(netloc, headers=proxy_headers)
+        else:
+            connection.forward_proxy_headers = proxy_headers
+
+        return connection
+
+    def _release(self, scheme, netloc, connection):
+        """Puts back `connection` in the pool, so it may be re-used later"""
+        with self._lock:
+            self._idle_connections.setdefault((scheme, netloc), []).append(
+                (connection, time.time())
+            )
+            self._schedule_eviction()
+
+    def _schedule_eviction(self):
+        """Plans to close the oldest idle connection when idle for too long (lock held)"""
+        if self._eviction_timer is not None or not self._idle_connections:
+            return
+
+        oldest_usage = min(
+            last_usage
+            for idle_connections in self._idle_connections.values()
+            for _, last_usage in idle_connections
+        )
+        self._eviction_timer = Timer(
+            max(0, oldest_usage + self.max_idle_time - time.time()),
+            self._run_eviction
+        )
+        self._eviction_timer.daemon = True
+        self._eviction_timer.start()
+
+    def _run_eviction(self):
+        """Closes connections idle for too long, and plans the next eviction (timer thread)"""
+        with self._lock:
+            self._eviction_timer = None
+            self._evict_idle_connections()
+            self._schedule_eviction()
+
+    def _evict_idle_connections(self):
+        """Closes connections idle for too long (the lock must be held)"""
+        deadline = time.time() - self.max_idle_time
+        for key, idle_connections in list(self._idle_connections.items()):
+            for connection, last_usage in idle_connections:
+                if last_usage < deadline:
+                    connection.close()
+
+            idle_connections[:] = [
+                idle_connection for idle_connection in idle_connections
+                if idle_connection[1] >= deadline
+            ]
+            if not idle_connections:
+                del self._idle_connections[key]
+
+    def close(self):
+        """Closes every idle connection"""
+        with self._lock:
+            if self._eviction_timer is not None:
+                self._eviction_timer.cancel()
+                self._eviction_timer = None
+
+            for idle_connections in self._idle_connections.values():
+                for connection, _ in idle_connections:
+                    connection.close()
+
+            self._idle_connections.clear()
+
+    def _send(self, scheme, netloc, path, headers, data=None):  # pylint: disable=too-many-arguments
+        """Sends a request, and returns the (status, reason, headers, body) of the response"""
+        connection, is_reused = self._acquire(scheme, netloc, self._get_timeout())
+        started_at = time.perf_counter()
+
+        # HTTP proxies expect absolute URLs (HTTPS ones are tunnelled, see `_connect()`).
+        target = path
+        forward_proxy_headers = getattr(connection, 'forward_proxy_headers', None)
+        if forward_proxy_headers is not None:
+            target = "{0}://{1}{2}".format(scheme, netloc, path)
+            headers = dict(headers, **forward_proxy_headers)
+
+        try:
+            connection.request(
+                'GET' if data is None else 'POST', target, body=data, headers=headers
+            )
+            response = connection.getresponse()
+            body = response.read()
+
+        except socket.timeout as error:
+            # A stuck request is never retried.
+            connection.close()
+            raise RequestTimeoutError(error) from error
+
+        except (_get_http_client().HTTPException, OSError) as error:
+            connection.close()
+
+            # The remote host may have closed an idle connection on its side, let's retry once.
+            if is_reused:
+                return self._send(scheme, netloc, path, headers, data)
+
+            raise URLError(error) from error
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(scheme, netloc, connection)
+
+        get_metrics().record_request(netloc, time.perf_counter() - started_at, len(body))
+
+        return response.status, response.reason, response.headers, body
+
+    def request(self, url, headers=None, data=None, rate_limit_resource=None):
+        """
+        Sends a GET request (or POST, if `data` is passed) to `url`...
+        ... and returns a (fully read) `Response` object.
+        As `urlopen`, it follows redirections and raises `HTTPError` on 4XX/5XX responses...
+        ... or `RateLimitError` when the rate limit of the remote API has been exceeded...
+        ... or `RequestTimeoutError` when it did not complete in time.
+        It counts against the `rate_limit_resource` quota of its host (see `CDNRateLimits`).
+        """
+        headers = dict(headers or {})
+        # Some APIs (as GitHub's one) reject requests without any User-Agent.
+        headers.setdefault('User-Agent', 'CDNUpdates')
+
+        for _ in range(MAX_REDIRECTIONS + 1):
+            parts = urlsplit(url)
+            path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+
+            with HOST_LIMITER.slot(parts.netloc):
+                status, reason, response_headers, body = self._send(
+                    parts.scheme, parts.netloc, path, headers, data
+                )
+
+            # Remaining quotas are tracked, so requests sure to fail are not sent.
+            if RATE_LIMITS.update(parts.netloc, status, response_headers, rate_limit_resource):
+                raise RateLimitError(
+                    url, status, reason, response_headers,
+                    RATE_LIMITS.get_reset_time(
+                        parts.netloc,
+                        response_headers.get('X-RateLimit-Resource') or rate_limit_resource
+                    )
+                )
+
+            if status in REDIRECTION_CODES and response_headers.get('Location'):
+                url = urljoin(url, response_headers['Location'])
+                continue
+
+            if status >= 400:
+                raise HTTPError(url, status, reason, response_headers, None)
+
+            return Response(url, status, response_headers, body)
+
+        raise URLError("Too many redirections for \"{0}\"".format(url))
+
+
+# This pool is shared by every lookup, and persists across command runs.
+HTTP_POOL = ConnectionPool()
+
+
+LOAD_TIMER.module_loaded(__name__)
@@ -0,0 +1,86 @@
+"""CDNUpdates' local index of the latest versions of a whole CDN catalog"""
+
+import json
+import os
+import time
+from threading import Lock
+
+from .CDNLoadTime import LOAD_TIMER
+from .CDNUtils import get_cache_path, log_message, read_json_file
+
+
+class LibraryIndex:
+    """
+    This class stores on disk (JSON) a whole "library -> latest version" index...
+    ... downloaded at once (with `download`), so lookups of a CDN are all served locally.
+    The index is lazily loaded (or downloaded) on first access, and refreshed after its TTL.
+    """
+
+    def __init__(self, file_name, download):
+        self.file_name = file_name
+        self.download = download
+
+        self._versions = None
+        self._fetched_at = 0
+        self._lock = Lock()
+
+    @property
+    def file_path(self):
+        """Path to the index file, within Sublime's cache directory"""
+        return os.path.join(get_cache_path(), self.file_name)
+
+    def _load(self):
+        """Reads the index file, if not already done (the lock must be held)"""
+        if self._versions is not None:
+            return
+
+        # A missing (or corrupted) file will be downloaded.
+        self._versions, self._fetched_at = \
+            read_json_file(self.file_path, ('versions', 'fetched_at')) or ({}, 0)
+
+    def _refresh(self):
+        """Downloads the index, and writes it on disk (the lock must be held)"""
+        self._fetched_at = time.time()
+
+        versions = self.download()
+        if versions is None:
+            # Lookups will be run one by one, until the index can be downloaded.
+            log_message("The index \"{0}\" could not be downloaded.".format(self.file_name))
+            return
+
+        self._versions = versions
+        log_message("The index \"{0}\" has been downloaded ({1} libraries).".format(
+            self.file_name, len(versions)
+        ))
+
+        try:
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            with open(self.file_path, 'w', encoding='utf-8') as file:
+                json.dump({'versions': versions, 'fetched_at': self._fetched_at}, file)
+        except OSError as error:
+            log_message("Could not write the index file ({0}).".format(error))
+
+    def get_versions(self, ttl):
+        """
+        Returns the index (library -> latest version), downloaded again if older than `ttl`.
+        Concurrent callers wait for a single download. Failed downloads are retried after `ttl`.
+        """
+        with self._lock:
+            self._load()
+            if time.time() - self._fetched_at > ttl:
+                self._refresh()
+
+            return self._versions
+
+    def invalidate(self):
+        """Drops the index, in memory and on disk"""
+        with self._lock:
+            self._versions, self._fetched_at = None, 0
+
+            try:
+                os.remove(self.file_path)
+            except OSError:
+                pass
+
+
+LOAD_TIMER.module_loaded(__name__)
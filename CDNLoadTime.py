@@ -0,0 +1,37 @@
+"""CDNUpdates' loading time, measured while its root modules are imported"""
+
+from time import perf_counter
+
+
+class LoadTimer:
+    """
+    This class measures the share of CDNUpdates in the loading of Sublime Text.
+    The plugin host imports root modules one after the other : the clock starts when the first...
+    ... of them imports this module, and each of them marks the end of its own import.
+    """
+
+    def __init__(self):
+        self.started_at = perf_counter()
+        self.last_mark = self.started_at
+
+        # module name -> time spent importing it (ms), the root modules it imported excluded
+        self.modules_load_times = {}
+
+    def module_loaded(self, module_name):
+        """Marks the end of the import of `module_name`"""
+        now = perf_counter()
+        self.modules_load_times[module_name] = (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def get_load_time(self):
+        """Returns the time (ms) from the first root module imported to the end of the last one"""
+        return (self.last_mark - self.started_at) * 1000
+
+    def get_slowest_modules(self, count=3):
+        """Returns the names of the `count` root modules whose imports took the longest"""
+        return sorted(
+            self.modules_load_times, key=self.modules_load_times.get, reverse=True
+        )[:count]
+
+
+LOAD_TIMER = LoadTimer()
@@ -0,0 +1,128 @@
+"""CDNUpdates' metrics of checks (phase timings, upstream latencies, cache usage)"""
+
+import json
+import time
+from contextlib import contextmanager
+from threading import Lock, local
+
+from .CDNLoadTime import LOAD_TIMER
+
+
+class Metrics:
+    """
+    This class gathers lightweight measures of a check :
+    * the duration of each phase (links scan, providers filter, resolution...) ;
+    * the latency and payload size of each upstream request, by host ;
+    * the cache hits, misses and revalidations (`304 Not Modified`).
+    It's reset when a check starts, and may be summarized or dumped (JSON) afterwards.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        # host -> {'requests': ..., 'total_time': ..., 'max_time': ..., 'bytes': ...}
+        self.hosts = {}
+        self.cache = {'hits': 0, 'misses': 0, 'revalidations': 0}
+
+        self._lock = Lock()
+
+    def reset(self):
+        """Drops every measure"""
+        with self._lock:
+            self.phases.clear()
+            self.hosts.clear()
+            self.cache.update(hits=0, misses=0, revalidations=0)
+
+    @contextmanager
+    def phase(self, name):
+        """Measures the duration of the `with` block as the phase `name`"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started_at
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def record_request(self, host, duration, nb_bytes):
+        """Records an upstream request to `host`, which took `duration` seconds"""
+        with self._lock:
+            host_metrics = self.hosts.setdefault(
+                host,
+                {'requests': 0, 'total_time': 0.0, 'max_time': 0.0, 'bytes': 0}
+            )
+            host_metrics['requests'] += 1
+            host_metrics['total_time'] += duration
+            host_metrics['max_time'] = max(host_metrics['max_time'], duration)
+            host_metrics['bytes'] += nb_bytes
+
+    def record_cache(self, event):
+        """Records a cache event : 'hits', 'misses' or 'revalidations'"""
+        with self._lock:
+            self.cache[event] += 1
+
+    def to_dict(self):
+        """Returns a (JSON serializable) copy of the measures"""
+        with self._lock:
+            return {
+                'phases': dict(self.phases),
+                'hosts': {
+                    host: dict(
+                        host_metrics,
+                        average_time=host_metrics['total_time'] / host_metrics['requests']
+                    )
+                    for host, host_metrics in self.hosts.items()
+                },
+                'cache': dict(self.cache),
+                'requests': sum(
+                    host_metrics['requests'] for host_metrics in self.hosts.values()
+                ),
+                'bytes_downloaded': sum(
+                    host_metrics['bytes'] for host_metrics in self.hosts.values()
+                )
+            }
+
+    def summary(self):
+        """Returns a one-line summary of the measures"""
+        metrics = self.to_dict()
+
+        return "{0} | {1} requests ({2:.1f} KiB) | cache : {3} hits, {4} misses".format(
+            ', '.join(
+                "{0} {1:.0f} ms".format(name, duration * 1000)
+                for name, duration in metrics['phases'].items()
+            ) or "no phase",
+            metrics['requests'],
+            metrics['bytes_downloaded'] / 1024,
+            metrics['cache']['hits'],
+            metrics['cache']['misses']
+        )
+
+    def dump(self, path):
+        """Writes the measures (JSON) to `path`"""
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+
+# These metrics are shared by every part of a check (a single check runs at a time)...
+METRICS = Metrics()
+
+# ... but measures may be recorded elsewhere by some threads (as the ones of a project scan).
+_THREAD_STATE = local()
+
+
+def get_metrics():
+    """Returns the metrics measures taken by the current thread are recorded into"""
+    return getattr(_THREAD_STATE, 'metrics', None) or METRICS
+
+
+@contextmanager
+def recording_into(metrics):
+    """Measures taken by the current thread within the `with` block are recorded into `metrics`"""
+    previous_metrics = getattr(_THREAD_STATE, 'metrics', None)
+    _THREAD_STATE.metrics = metrics
+    try:
+        yield
+    finally:
+        _THREAD_STATE.metrics = previous_metrics
+
+
+LOAD_TIMER.module_loaded(__name__)
@@ -0,0 +1,241 @@
+"""CDNUpdates' project-wide scan, reported in an output panel"""
+
+import time
+from threading import Lock
+
+from sublime import error_message, set_timeout, status_message
+
+from .CDNBatchScan import (
+    DEFAULT_EXCLUDED_DIRECTORIES,
+    DEFAULT_EXTENSIONS,
+    get_cdn_contents,
+    iter_source_files,
+    scan_file
+)
+from .CDNLoadTime import LOAD_TIMER
+from .CDNMetrics import Metrics
+from .CDNResolver import Resolver
+from .CDNUtils import get_settings, log_message
+from .CDNWorkerPool import run_in_background
+
+
+# Results are written to this output panel...
+OUTPUT_PANEL_NAME = 'cdn_updates'
+# ... whose lines start with a location ("file:line:column: "), so they may be jumped to.
+RESULT_FILE_REGEX = r'^(.+?):(\d+):(\d+): '
+
+# The progress shown in the status bar is refreshed at most this often (seconds).
+PROGRESS_INTERVAL = 0.2
+
+# Project scans are run on their own background worker (see `CDNWorkerPool`).
+WORKER_NAME = 'project_scans'
+
+# How each status is reported in the output panel.
+STATUS_LABELS = {
+    'up_to_date': "up to date",
+    'to_update': "to update",
+    'not_found': "not found",
+    'pending': "pending (rate limit reached)",
+    'timed_out': "timed out"
+}
+
+# window.id() -> the project scan running for this window
+PROJECT_SCANS = {}
+
+
+def describe(cdn_content):
+    """Returns the line of the output panel reporting `cdn_content`"""
+    path, line, column = cdn_content.sublime_region
+
+    description = "{0}:{1}:{2}: {3} : {4}".format(
+        path, line, column,
+        STATUS_LABELS.get(cdn_content.status, "unknown"),
+        cdn_content.parsed_result.geturl()
+    )
+
+    if cdn_content.status == 'to_update':
+        if cdn_content.latest_version:
+            description += " (new version : {0})".format(cdn_content.latest_version)
+        else:
+            description += " (no version specified)"
+
+    if cdn_content.parsed_result.scheme != 'https':
+        description += " (not loaded over HTTPS)"
+
+    return description
+
+
+class ProjectScan:
+    """
+    This class checks every source file of the folders opened in a window, in background.
+    Files are scanned by a thread pool, and CDN of every file go through a single resolver...
+    ... so a library used by hundreds of templates is only looked up once.
+    """
+
+    def __init__(self, window, paths):
+        self.window = window
+        self.paths = paths
+
+        self._is_cancelled = False
+
+        # Its measures are kept apart from the ones of checks (which may run meanwhile).
+        self.metrics = Metrics()
+
+        # Number of elements done by the current phase, and when the progress was last shown.
+        self._nb_done = 0
+        self._progress_shown_at = 0
+        self._lock = Lock()
+
+    def start(self):
+        """Queues this scan on its background worker, cancelling the previous one of this window"""
+        previous_scan = PROJECT_SCANS.get(self.window.id())
+        if previous_scan is not None:
+            previous_scan.cancel()
+
+        PROJECT_SCANS[self.window.id()] = self
+        run_in_background(self.run, WORKER_NAME)
+
+    def cancel(self):
+        """Stops this scan as soon as possible (running requests are not interrupted)"""
+        self._is_cancelled = True
+
+    def is_cancelled(self):
+        """Whether this scan has been cancelled"""
+        return self._is_cancelled
+
+    def run(self):
+        """Scans files, resolves the CDN found, and reports them (in the output panel)"""
+        try:
+            if self.is_cancelled():
+                return
+
+            cdn_content_list = self.scan()
+            if not self.is_cancelled():
+                self.resolve(cdn_content_list)
+
+            if self.is_cancelled():
+                status_message("CDNUpdates: project scan cancelled.")
+                return
+
+            log_message("Project scan metrics : {0}".format(self.metrics.summary()))
+            set_timeout(lambda: self.report(cdn_content_list))
+
+        finally:
+            if PROJECT_SCANS.get(self.window.id()) is self:
+                del PROJECT_SCANS[self.window.id()]
+
+    def show_progress(self, action, total):
+        """Counts an element done by the current phase, and shows the progress (from any thread)"""
+        with self._lock:
+            self._nb_done += 1
+            if self._nb_done < total and \
+                    time.perf_counter() - self._progress_shown_at < PROGRESS_INTERVAL:
+                return
+
+            self._progress_shown_at = time.perf_counter()
+            nb_done = self._nb_done
+
+        status_message("CDNUpdates: {0} ({1}/{2})...".format(action, nb_done, total))
+
+    def scan(self):
+        """Returns the CDN found in the source files of `self.paths` (scanned concurrently)"""
+        from concurrent.futures import ThreadPoolExecutor  # pylint: disable=import-outside-toplevel
+
+        file_paths = list(iter_source_files(
+            self.paths,
+            get_settings().get('project_scan_extensions') or DEFAULT_EXTENSIONS,
+            DEFAULT_EXCLUDED_DIRECTORIES
+        ))
+        self._nb_done = 0
+
+        def scan_and_count(file_path):
+            if self.is_cancelled():
+                return file_path, []
+
+            result = scan_file(file_path)
+            self.show_progress("scanning files", len(file_paths))
+            return result
+
+        cdn_content_list = []
+        max_workers = max(1, get_settings().get('project_scan_workers', 4))
+        with self.metrics.phase('links_scan'), \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for path, links in executor.map(scan_and_count, file_paths):
+                cdn_content_list.extend(get_cdn_contents(path, links))
+
+        with self.metrics.phase('providers_parsing'):
+            for cdn_content in cdn_content_list:
+                cdn_content.handle_provider()
+
+        return cdn_content_list
+
+    def resolve(self, cdn_content_list):
+        """Resolves (once per upstream identity) the latest versions of `cdn_content_list`"""
+        nb_lookups = len({
+            cdn_content.lookup for cdn_content in cdn_content_list
+            if cdn_content.lookup is not None
+        })
+        self._nb_done = 0
+
+        # A whole project may take a while : it's only stopped by a cancellation.
+        resolver = Resolver(self.is_cancelled, self.metrics)
+        resolver.check_timeout = 0
+
+        with self.metrics.phase('resolution'):
+            resolver.resolve(
+                cdn_content_list,
+                on_resolved=lambda _: self.show_progress("resolving libraries", nb_lookups)
+            )
+
+    def report(self, cdn_content_list):
+        """Writes the results in the output panel, and shows it (on the main thread)"""
+        statuses = [cdn_content.status for cdn_content in cdn_content_list]
+        lines = [
+            "CDNUpdates : {0} CDN found, {1} up to date, {2} to update, {3} not found, "
+            "{4} pending, {5} timed out.".format(
+                len(cdn_content_list),
+                statuses.count('up_to_date'),
+                statuses.count('to_update'),
+                statuses.count('not_found'),
+                statuses.count('pending'),
+                statuses.count('timed_out')
+            ),
+            ""
+        ]
+        lines.extend(describe(cdn_content) for cdn_content in cdn_content_list)
+
+        panel = self.window.create_output_panel(OUTPUT_PANEL_NAME)
+        panel.settings().set('result_file_regex', RESULT_FILE_REGEX)
+        panel.settings().set('word_wrap', False)
+        panel.run_command('append', {'characters': "\n".join(lines) + "\n"})
+        panel.set_read_only(True)
+
+        self.window.run_command('show_panel', {'panel': 'output.' + OUTPUT_PANEL_NAME})
+        status_message("CDNUpdates: project scan done ({0} CDN found).".format(
+            len(cdn_content_list)
+        ))
+
+
+def scan_project(window):
+    """Starts a scan of the folders opened in `window`"""
+    paths = window.folders()
+    if not paths:
+        error_message("No folder is opened in this window.")
+        return
+
+    status_message("CDNUpdates: scanning the project...")
+    ProjectScan(window, paths).start()
+
+
+def cancel_project_scan(window):
+    """Cancels the scan running for `window` (if any)"""
+    project_scan = PROJECT_SCANS.get(window.id())
+    if project_scan is None:
+        status_message("CDNUpdates: no project scan is running.")
+        return
+
+    project_scan.cancel()
+    status_message("CDNUpdates: cancelling the project scan...")
+
+
+LOAD_TIMER.module_loaded(__name__)
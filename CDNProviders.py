@@ -0,0 +1,418 @@
+"""CDNUpdates' CDN providers registry"""
+
+import re
+from urllib.parse import ParseResult
+
+from .CDNConstants import (
+    AJAX_GOOGLE_APIS_CORRESPONDENCES,
+    AJAX_MICROSOFT_CORRESPONDENCES,
+    CDN_STATIC_FILE_CORRESPONDENCES,
+    MAXCDN_BOOTSTRAP_CORRESPONDENCES,
+    OPENSOURCE_KEYCDN_CORRESPONDENCES,
+    PROVIDER_LINK_REGEXP_TEMPLATE
+)
+from .CDNLoadTime import LOAD_TIMER
+from .CDNSemver import search_semver
+from .CDNUtils import log_message
+
+
+# Links are decomposed (scheme, host, path, query and fragment) in a single match (see RFC 3986).
+# `\Z` anchors it to the end of the link, since `Pattern.fullmatch()` only came with Python 3.4.
+URL_REGEXP_PATTERN = r"(?:([a-z][a-z\d+.-]*):)?(?://([^/?#]*))?([^?#]*)(?:\?([^#]*))?(?:#(.*))?\Z"
+
+# This regular expression is lazily compiled.
+_URL_REGEXP_OBJECT = None
+
+
+def parse_url(url):
+    """
+    Returns the `ParseResult` of `url`, as `urlparse` does (but path parameters are kept...
+    ... within the path), from a single match of a compiled regular expression.
+    """
+    global _URL_REGEXP_OBJECT  # pylint: disable=global-statement
+    if _URL_REGEXP_OBJECT is None:
+        _URL_REGEXP_OBJECT = re.compile(URL_REGEXP_PATTERN, re.IGNORECASE | re.DOTALL)
+
+    scheme, netloc, path, query, fragment = _URL_REGEXP_OBJECT.match(url).groups('')
+    return ParseResult(scheme.lower(), netloc, path, '', query, fragment)
+
+
+class CDNProvider:  # pylint: disable=too-few-public-methods
+    """
+    Base class of CDN providers.
+    A provider declares the `hosts` it serves, and parses the path of their links...
+    ... to figure out the name and version of the library (and the upstream lookup to plan).
+    """
+
+    hosts = ()
+
+    # Libraries known to be delivered by this provider (see `CDNConstants`), if listed.
+    correspondences = {}
+
+    # Providers whose links always share the same layout declare it as a regular expression...
+    # ... capturing (at least) the `name` and the `version` of the library (see `parse_match()`).
+    path_pattern = None
+
+    def __init__(self):
+        # `path_pattern` is compiled on first use, not when Sublime Text loads the plugin.
+        self._path_regexp = None
+
+    def parse_path(self, cdn_content, path):
+        """
+        Parses the `path` of a link : in a single match of `path_pattern` (if declared)...
+        ... or split around '/' (see `parse()`). Raises `IndexError` if it's too short.
+        """
+        if self.path_pattern is None:
+            self.parse(cdn_content, path.split('/'))
+            return
+
+        if self._path_regexp is None:
+            self._path_regexp = re.compile(self.path_pattern)
+
+        match = self._path_regexp.match(path)
+        if match is None:
+            raise IndexError(path)
+
+        self.parse_match(cdn_content, match)
+
+    def parse(self, cdn_content, path_parts):  # pylint: disable=unused-argument
+        """
+        Sets the `name` of `cdn_content` (and its `status`, or plans an upstream lookup).
+        `path_parts` is the path of the link split around '/'.
+        Providers declaring a `path_pattern` implement `parse_match()` instead.
+        """
+        log_message("{0} does not know how to parse its links.".format(type(self).__name__))
+        cdn_content.status = 'not_found'
+
+    def parse_match(self, cdn_content, match):
+        """
+        Same as `parse()`, from the `match` of `path_pattern`.
+        By default, the library is looked up from the `correspondences` table.
+        """
+        cdn_content.name = match.group('name')
+        self._plan_correspondence_lookup(
+            cdn_content, self.correspondences, match.group('version')
+        )
+
+    def get_known_lookups(self):
+        """Returns the upstream lookups this provider is known to plan (for offline snapshots)"""
+        return [
+            ('github_tag', "{0}/{1}".format(correspondence['owner'], correspondence['name']))
+            for correspondence in self.correspondences.values()
+        ]
+
+    @staticmethod
+    def _plan_correspondence_lookup(cdn_content, correspondences, version, fuzzy_check=False):
+        """Plans a GitHub tag lookup for a library listed in `correspondences`"""
+        if cdn_content.name not in correspondences:
+            log_message("{0} is not known to be delivered by this provider.".format(
+                cdn_content.name
+            ))
+            cdn_content.status = 'not_found'
+            return
+
+        cdn_content.plan_lookup(
+            'github_tag',
+            "{0}/{1}".format(
+                correspondences[cdn_content.name]['owner'],
+                correspondences[cdn_content.name]['name']
+            ),
+            version,
+            fuzzy_check
+        )
+
+
+class CDNJSProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """CDNJS.com will be handled here"""
+
+    hosts = ('cdnjs.cloudflare.com',)
+    # As "/ajax/libs/{name}/{version}/...".
+    path_pattern = r"/[^/]*/[^/]*/(?P<name>[^/]*)/(?P<version>[^/]*)"
+
+    def parse_match(self, cdn_content, match):
+        cdn_content.name = match.group('name')
+        cdn_content.plan_lookup('cdnjs', cdn_content.name, match.group('version'))
+
+
+class MaxCDNBootstrapProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """CDN from MAXCDN.BOOTSTRAPCDN.COM will be handled here"""
+
+    hosts = ('maxcdn.bootstrapcdn.com',)
+    correspondences = MAXCDN_BOOTSTRAP_CORRESPONDENCES
+    path_pattern = r"/(?P<name>[^/]*)/(?P<version>[^/]*)"
+
+
+class JQueryProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """CDN from CODE.JQUERY.COM will be handled here"""
+
+    hosts = ('code.jquery.com',)
+
+    def parse(self, cdn_content, path_parts):
+        if path_parts[1].startswith('jquery'):
+            cdn_content.name = 'jquery'
+            version = search_semver(path_parts[1])
+        elif path_parts[1] in ('ui', 'mobile', 'color'):
+            cdn_content.name = 'jquery-' + path_parts[1]
+            version = path_parts[2]
+        elif path_parts[1] == 'qunit':
+            cdn_content.name = 'qunit'
+            version = search_semver(path_parts[2])
+        elif path_parts[1] == 'pep':
+            cdn_content.name = 'PEP'
+            version = path_parts[2]
+        else:
+            version = None
+
+        if not version:
+            cdn_content.status = 'not_found'
+            return
+
+        cdn_content.plan_lookup(
+            'github_tag',
+            # Only `QUnit` belongs to another organization.
+            "{0}/{1}".format(
+                'qunitjs' if cdn_content.name == 'qunit' else 'jquery',
+                cdn_content.name
+            ),
+            version
+        )
+
+    def get_known_lookups(self):
+        return [
+            ('github_tag', repository) for repository in (
+                'jquery/jquery', 'jquery/jquery-ui', 'jquery/jquery-mobile',
+                'jquery/jquery-color', 'qunitjs/qunit', 'jquery/PEP'
+            )
+        ]
+
+
+class GoogleAPIsProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """CDN from AJAX.GOOGLEAPIS.COM will be handled here"""
+
+    hosts = ('ajax.googleapis.com',)
+    correspondences = AJAX_GOOGLE_APIS_CORRESPONDENCES
+    # As "/ajax/libs/{name}/{version}/...".
+    path_pattern = r"/[^/]*/[^/]*/(?P<name>[^/]*)/(?P<version>[^/]*)"
+
+
+class JSDelivrProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """
+    CDN from CDN.JSDLIVR.NET will be handled here.
+    The API from JSDLIVR is powerful.
+    It implies we compute a "fuzzy" version checking.
+    For instance : "jquery@3" is OK for '3.2.1'.
+    """
+
+    hosts = ('cdn.jsdelivr.net',)
+
+    def parse(self, cdn_content, path_parts):
+        try:
+            if path_parts[1] == 'npm':
+                # Scoped packages (as "@org/pkg@1.2.3") span two segments of the path.
+                scope, package = '', path_parts[2]
+                if package.startswith('@'):
+                    scope, package = package + '/', path_parts[3]
+
+                name, version = package.split('@')
+                cdn_content.name = scope + name
+                cdn_content.plan_lookup('npm', cdn_content.name, version)
+
+            elif path_parts[1] == 'gh':
+                cdn_content.name, version = path_parts[3].split('@')
+                cdn_content.plan_lookup(
+                    'github_tag',
+                    "{0}/{1}".format(path_parts[2], cdn_content.name),
+                    version,
+                    fuzzy_check=True
+                )
+
+            elif path_parts[1] == 'wp':
+                # This how we'll handle the latest version references, as :
+                # <https://cdn.jsdelivr.net/wp/wp-slimstat/trunk/wp-slimstat.js>
+                if len(path_parts) < 6:
+                    raise IndexError
+
+                cdn_content.name = path_parts[2]
+                cdn_content.plan_lookup('wpsvn', cdn_content.name, path_parts[4])
+
+            else:
+                cdn_content.status = 'not_found'
+
+        except (ValueError, IndexError):
+            # This statement is here to handle `split()` errors.
+            # This page seems using a CDN without specifying a version.
+            cdn_content.status = 'to_update'
+
+
+class RawGitProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """CDN from (CDN.)?RAWGIT.COM will be handled here"""
+
+    hosts = ('rawgit.com', 'cdn.rawgit.com')
+
+    def parse(self, cdn_content, path_parts):
+        cdn_content.name = path_parts[2]
+
+        # If no semantic version is specified in the URL, we assume either:
+        # * The developer uses the latest version available (`master`) [OR]
+        # * The developer knows what he is doing (commit hash specified)
+        if not search_semver(path_parts[3]):
+            cdn_content.status = 'up_to_date'
+        else:
+            # If not, we compare this version with the latest tag !
+            cdn_content.plan_lookup(
+                'github_tag',
+                "{0}/{1}".format(path_parts[1], cdn_content.name),
+                path_parts[3]
+            )
+
+
+class IonicProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """CDN from CODE.IONICFRAMEWORK.COM will be handled here"""
+
+    hosts = ('code.ionicframework.com',)
+    path_pattern = r"/(?P<name>[^/]*)/(?P<version>[^/]*)"
+
+    def parse_match(self, cdn_content, match):
+        cdn_content.name = match.group('name')
+        cdn_content.plan_lookup(
+            'github_release',
+            "ionic-team/{0}".format(cdn_content.name),
+            match.group('version')
+        )
+
+    def get_known_lookups(self):
+        return [('github_release', 'ionic-team/ionicons')]
+
+
+class FontAwesomeProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """CDN from USE.FONTAWESOME.COM will be handled here"""
+
+    hosts = ('use.fontawesome.com',)
+
+    def parse(self, cdn_content, path_parts):
+        cdn_content.name = 'Font Awesome'
+
+        # We assume here that FA's CDN always serves the latest version.
+        cdn_content.status = 'up_to_date'
+
+
+class KeyCDNProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """CDN from OPENSOURCE.KEYCDN.COM will be handled here"""
+
+    hosts = ('opensource.keycdn.com',)
+    correspondences = OPENSOURCE_KEYCDN_CORRESPONDENCES
+    path_pattern = r"/(?P<name>[^/]*)/(?P<version>[^/]*)"
+
+
+class StaticFileProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """CDN from CDN.STATICFILE.ORG will be handled here"""
+
+    hosts = ('cdn.staticfile.org',)
+    correspondences = CDN_STATIC_FILE_CORRESPONDENCES
+    path_pattern = r"/(?P<name>[^/]*)/(?P<version>[^/]*)"
+
+
+class AspNetCDNProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """CDN from AJAX.ASPNETCDN.COM (or AJAX.MICROSOFT.COM) will be handled here"""
+
+    hosts = ('ajax.microsoft.com', 'ajax.aspnetcdn.com')
+    correspondences = AJAX_MICROSOFT_CORRESPONDENCES
+
+    def parse(self, cdn_content, path_parts):
+        # Sometimes the version is in the path...
+        if len(path_parts) == 5:
+            version = path_parts[3]
+        # ... and some other times contained within the name.
+        else:
+            version = search_semver(path_parts[3])
+
+        if path_parts[2] not in self.correspondences or not version:
+            cdn_content.status = 'not_found'
+            return
+
+        cdn_content.name = path_parts[2]
+        self._plan_correspondence_lookup(
+            cdn_content, self.correspondences, version,
+            # Microsoft has tagged some libraries very badly...
+            # Check `CDNConstants.AJAX_MICROSOFT_CORRESPONDENCES` for this entry.
+            self.correspondences[cdn_content.name].get('fuzzy_check', False)
+        )
+
+
+class CKEditorProvider(CDNProvider):  # pylint: disable=too-few-public-methods
+    """CDN from CDN.CKEDITOR.COM will be handled here"""
+
+    hosts = ('cdn.ckeditor.com',)
+
+    def parse(self, cdn_content, path_parts):
+        if path_parts[1] == 'ckeditor5' and \
+           path_parts[3] in ('classic', 'inline', 'balloon'):
+            cdn_content.name = "{0} ({1})".format(path_parts[1], path_parts[3])
+            cdn_content.plan_lookup(
+                'github_release',
+                "ckeditor/{0}".format(path_parts[1]),
+                path_parts[2]
+            )
+
+        else:
+            cdn_content.status = 'not_found'
+
+    def get_known_lookups(self):
+        return [('github_release', 'ckeditor/ckeditor5')]
+
+
+# This dictionary maps each handled host to the provider object parsing its links.
+PROVIDERS_REGISTRY = {}
+
+
+def register_provider(provider):
+    """Registers `provider` (a `CDNProvider` instance) for each of its hosts"""
+    for host in provider.hosts:
+        PROVIDERS_REGISTRY[host] = provider
+
+
+def get_provider(host):
+    """Returns the provider serving `host`, or `None` if it's not handled"""
+    return PROVIDERS_REGISTRY.get(host)
+
+
+# The providers links pattern is only re-built when the registry changes.
+_PROVIDER_LINK_PATTERN_CACHE = {}
+
+
+def get_provider_link_pattern():
+    """
+    Returns a regular expression matching only links served by registered providers.
+    Hosts are gathered in a single alternation (longest first, so none shadows another).
+    """
+    hosts = tuple(sorted(PROVIDERS_REGISTRY, key=len, reverse=True))
+
+    pattern = _PROVIDER_LINK_PATTERN_CACHE.get(hosts)
+    if pattern is None:
+        pattern = PROVIDER_LINK_REGEXP_TEMPLATE.format(
+            hosts='|'.join(re.escape(host) for host in hosts)
+        )
+        _PROVIDER_LINK_PATTERN_CACHE.clear()
+        _PROVIDER_LINK_PATTERN_CACHE[hosts] = pattern
+
+    return pattern
+
+
+# Additional CDN providers may be registered there (or from another module).
+for _provider_class in (
+        CDNJSProvider,
+        MaxCDNBootstrapProvider,
+        JQueryProvider,
+        GoogleAPIsProvider,
+        JSDelivrProvider,
+        RawGitProvider,
+        IonicProvider,
+        FontAwesomeProvider,
+        KeyCDNProvider,
+        StaticFileProvider,
+        AspNetCDNProvider,
+        CKEditorProvider):
+    register_provider(_provider_class())
+
+
+LOAD_TIMER.module_loaded(__name__)
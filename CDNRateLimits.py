@@ -0,0 +1,116 @@
+"""CDNUpdates' tracking of upstream APIs rate limits"""
+
+import time
+from threading import Lock
+from urllib.error import HTTPError
+
+from .CDNLoadTime import LOAD_TIMER
+
+
+# When an API asks us to slow down without telling until when, we wait this long (seconds).
+# `Retry-After` HTTP-date values are not parsed, this delay is used instead.
+DEFAULT_RETRY_AFTER = 60
+
+
+def _parse_integer(value):
+    """Returns the integer value of a header (or `None` if it's missing or malformed)"""
+    return int(value) if value is not None and value.strip().isdigit() else None
+
+
+class RateLimitError(HTTPError):  # pylint: disable=too-many-ancestors
+    """Raised when an upstream API rejects a request because its rate limit has been exceeded"""
+
+    def __init__(self, url, code, msg, headers, reset_at):  # pylint: disable=too-many-arguments
+        super().__init__(url, code, msg, headers, None)
+        self.reset_at = reset_at
+
+
+class RateLimitTracker:
+    """
+    This class keeps track of the remaining quota of each upstream host...
+    ... as advertised by `X-RateLimit-Remaining` / `X-RateLimit-Reset` and `Retry-After` headers.
+    A host may have several quotas (as GitHub REST and GraphQL APIs), told apart by the...
+    ... `X-RateLimit-Resource` header : requests declare the `resource` they count against.
+    Hosts which never advertised any quota are considered unlimited.
+    """
+
+    def __init__(self):
+        # (host, resource) -> [remaining requests, time (epoch) of the reset, limit (if known)]
+        self._quotas = {}
+        self._lock = Lock()
+
+    def update(self, host, status, headers, resource=None):
+        """
+        Updates the quota of `host` from a response (`status` and `headers`) to a request...
+        ... counting against `resource`, unless the response tells it counted against another one.
+        Returns whether this response means the rate limit has been exceeded.
+        """
+        key = (host, headers.get('X-RateLimit-Resource') or resource)
+        limit = _parse_integer(headers.get('X-RateLimit-Limit'))
+        remaining = _parse_integer(headers.get('X-RateLimit-Remaining'))
+        reset_at = _parse_integer(headers.get('X-RateLimit-Reset'))
+        retry_after = headers.get('Retry-After')
+
+        is_rate_limited = status == 429 or (
+            status == 403 and (retry_after is not None or remaining == 0)
+        )
+
+        with self._lock:
+            if is_rate_limited or retry_after is not None:
+                # `Retry-After` prevails, then the advertised reset time, then a default delay.
+                retry_after = _parse_integer(retry_after)
+                if retry_after is not None:
+                    reset_at = time.time() + retry_after
+                elif reset_at is None:
+                    reset_at = time.time() + DEFAULT_RETRY_AFTER
+
+                self._quotas[key] = [0, reset_at, limit]
+
+            elif remaining is not None and reset_at is not None:
+                self._quotas[key] = [remaining, reset_at, limit]
+
+        return is_rate_limited
+
+    def try_acquire(self, host, reserve=0, resource=None):
+        """
+        Counts a request about to be sent to `host` (against `resource`), if its quota allows...
+        ... it, keeping `reserve` requests untouched. Returns whether it may be sent.
+        """
+        with self._lock:
+            quota = self._quotas.get((host, resource))
+            if quota is None:
+                return True
+
+            if time.time() >= quota[1]:
+                if quota[2] is None:
+                    # The quota has been reset since, it will be known again on next response.
+                    del self._quotas[(host, resource)]
+                    return True
+
+                # The whole quota is available again (the next reset will be known soon).
+                quota[0], quota[1] = quota[2], time.time() + DEFAULT_RETRY_AFTER
+
+            if quota[0] <= reserve:
+                return False
+
+            # Responses will correct this estimation.
+            quota[0] -= 1
+            return True
+
+    def clear(self):
+        """Forgets every known quota"""
+        with self._lock:
+            self._quotas.clear()
+
+    def get_reset_time(self, host, resource=None):
+        """Returns the time (epoch) at which the `resource` quota of `host` is reset (or `None`)"""
+        with self._lock:
+            quota = self._quotas.get((host, resource))
+            return quota[1] if quota is not None else None
+
+
+# Quotas are shared by every check, as they are by the upstream APIs.
+RATE_LIMITS = RateLimitTracker()
+
+
+LOAD_TIMER.module_loaded(__name__)
@@ -0,0 +1,173 @@
+"""CDNUpdates' (diff-based) rendering of results in a view"""
+
+from functools import lru_cache
+
+from sublime import (
+    DRAW_EMPTY_AS_OVERWRITE,
+    DRAW_NO_FILL,
+    DRAW_NO_OUTLINE,
+    DRAW_SOLID_UNDERLINE,
+    LAYOUT_BLOCK
+)
+
+from .CDNLoadTime import LOAD_TIMER
+from .CDNUtils import clear_view
+
+
+# Phantoms templates (CSS class, background color and message), turned into HTML only once.
+_PHANTOM_TEMPLATES = {
+    'latest_versions': (
+        'new_version', 'bluish',
+        "New version for {0} found : <b>{1}</b>"
+    ),
+    'specify_versions': (
+        'no_version_found', 'orangish',
+        "You should specify a version for <b>{0}</b>."
+    ),
+    'specify_https': (
+        'https_warning', 'redish',
+        "You should explicitly load <b>{0}</b> over HTTPS !"
+    )
+}
+PHANTOM_TEMPLATES = {
+    key: (
+        '<body id="CDN-{0}">'
+        '<style>'
+        'div.{0} {{{{ background-color: var(--{1}); color: black; padding: 10px; }}}}'
+        '</style>'
+        '<div class="{0}">{2}</div>'
+        '</body>'
+    ).format(css_class, color, message)
+    for key, (css_class, color, message) in _PHANTOM_TEMPLATES.items()
+}
+
+# Statuses drawn as regions, with their gutter icon (pending and timed out CDN get built-in ones).
+REGION_ICONS = {
+    'up_to_date': "Packages/CDNUpdates/Icons/up_to_date.png",
+    'to_update': "Packages/CDNUpdates/Icons/to_update.png",
+    'not_found': "Packages/CDNUpdates/Icons/not_found.png",
+    'pending': 'circle',
+    'timed_out': 'dot'
+}
+
+
+@lru_cache(maxsize=1024)
+def render_phantom(key, *arguments):
+    """Returns the HTML of the phantom `key`, filled with `arguments` (results are re-used)"""
+    return PHANTOM_TEMPLATES[key].format(*arguments)
+
+
+def get_phantoms_contents(cdn_content):
+    """Returns a dictionary (phantom key -> HTML) describing the result of `cdn_content`"""
+    phantoms_contents = {}
+
+    # If this CDN represents a problem "that has to be fixed"...
+    if cdn_content.status == 'to_update':
+        # If the CDN is to update and we retrieved a newer version...
+        # ...let's set a "Phantom" with an interesting content 😉
+        if cdn_content.latest_version:
+            phantoms_contents['latest_versions'] = render_phantom(
+                'latest_versions', cdn_content.name, cdn_content.latest_version
+            )
+
+        # Let's inform the user he should specify version for this CDN.
+        else:
+            phantoms_contents['specify_versions'] = render_phantom(
+                'specify_versions', cdn_content.parsed_result.path.rpartition('/')[2]
+            )
+
+    # Security measures !
+    # If this resource is not loaded over HTTPS (and has been checked), we add a warning !
+    if cdn_content.status is not None and cdn_content.parsed_result.scheme != 'https':
+        phantoms_contents['specify_https'] = render_phantom(
+            'specify_https',
+            cdn_content.name or
+            cdn_content.parsed_result.path.rpartition('/')[2]
+        )
+
+    return phantoms_contents
+
+
+class ViewRenderer:
+    """
+    This class keeps track of the elements drawn for each CDN of a view (phantoms and regions).
+    On each update, only elements of CDN whose result changed are drawn again :
+    * phantoms are kept in persistent sets (one per key), indexed by CDN ;
+    * a region set is only replaced when the CDN having its status changed.
+    """
+
+    def __init__(self, view):
+        self.view = view
+
+        # key -> {CDN -> (HTML content, phantom identifier)}
+        self._phantom_sets = {key: {} for key in PHANTOM_TEMPLATES}
+        # status -> CDN drawn with it
+        self._region_sets = {status: frozenset() for status in REGION_ICONS}
+
+    def update(self, cdn_content_list):
+        """
+        Synchronizes drawn elements with `cdn_content_list`.
+        Elements of CDN missing from it (as the ones re-scanned) are removed.
+        """
+        removed_cdn_contents = {
+            key: set(phantom_set) for key, phantom_set in self._phantom_sets.items()
+        }
+
+        for cdn_content in cdn_content_list:
+            phantoms_contents = get_phantoms_contents(cdn_content)
+
+            for key, phantom_set in self._phantom_sets.items():
+                removed_cdn_contents[key].discard(cdn_content)
+
+                content = phantoms_contents.get(key)
+                drawn_phantom = phantom_set.get(cdn_content)
+                if drawn_phantom is not None and drawn_phantom[0] == content:
+                    continue
+
+                if drawn_phantom is not None:
+                    self.view.erase_phantom_by_id(drawn_phantom[1])
+                    del phantom_set[cdn_content]
+
+                if content is not None:
+                    phantom_set[cdn_content] = (
+                        content,
+                        self.view.add_phantom(
+                            key, cdn_content.sublime_region, content, LAYOUT_BLOCK
+                        )
+                    )
+
+        for key, cdn_contents in removed_cdn_contents.items():
+            for cdn_content in cdn_contents:
+                self.view.erase_phantom_by_id(self._phantom_sets[key].pop(cdn_content)[1])
+
+        # Regions are moved by Sublime Text itself, so they only depend on CDN statuses.
+        for status, drawn_region_set in self._region_sets.items():
+            region_cdn_contents = [
+                cdn_content for cdn_content in cdn_content_list
+                if cdn_content.status == status
+            ]
+            region_set = frozenset(region_cdn_contents)
+            if region_set == drawn_region_set:
+                continue
+
+            self.view.add_regions(
+                status,
+                [cdn_content.sublime_region for cdn_content in region_cdn_contents],
+                'text',
+                REGION_ICONS[status],
+                DRAW_EMPTY_AS_OVERWRITE | DRAW_NO_FILL | DRAW_NO_OUTLINE |
+                DRAW_SOLID_UNDERLINE
+            )
+            self._region_sets[status] = region_set
+
+    def clear(self):
+        """Removes every element drawn, and forgets them"""
+        clear_view(self.view)
+
+        for phantom_set in self._phantom_sets.values():
+            phantom_set.clear()
+        for status in self._region_sets:
+            self._region_sets[status] = frozenset()
+
+
+LOAD_TIMER.module_loaded(__name__)
@@ -0,0 +1,329 @@
+"""CDNUpdates' upstream versions resolver"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from urllib.error import URLError
+
+from .CDNCache import VERSION_CACHE
+from .CDNHttp import HTTP_POOL, RequestTimeoutError
+from .CDNLoadTime import LOAD_TIMER
+from .CDNMetrics import METRICS, recording_into
+from .CDNRateLimits import RATE_LIMITS, RateLimitError
+from .CDNSnapshot import SNAPSHOT
+from .CDNUpstreams import UPSTREAMS
+from .CDNUtils import get_settings, log_message
+from .CDNWorkerPool import WorkerPool
+
+
+# Lookups deferred because of a rate limit get this result...
+DEFERRED = object()
+# ... lookups not done before the deadline this one...
+TIMED_OUT = object()
+# ... and lookups cancelled (whose CDN may belong to a newer check now) this last one.
+CANCELLED = object()
+
+
+class Resolver:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """
+    This class resolves the latest versions required by a list of `CDNContent`.
+    It acts as a "single-flight" layer : every CDN resolving to the same upstream identity...
+    ... is grouped, so only one lookup is issued for them, and its result shared.
+    """
+
+    def __init__(self, is_cancelled=None, metrics=None):
+        self.settings = get_settings()
+
+        # Cache usage and requests of this resolution are recorded there (see `CDNMetrics`).
+        self.metrics = metrics or METRICS
+
+        # Once cancelled (or past the deadline), remaining lookups are not run anymore...
+        # ... and once cancelled, no status is written anymore.
+        self.is_cancelled = is_cancelled or (lambda: False)
+        # Number of seconds a whole resolution may last (`0` disables the deadline).
+        self.check_timeout = self.settings.get('check_timeout', 30)
+        self.deadline = None
+
+        self.pool = WorkerPool(
+            self.settings.get('max_concurrent_lookups', 8),
+            self.settings.get('max_concurrent_lookups_per_host', 4)
+        )
+
+        # Connections to upstream APIs are kept alive between runs, but not forever.
+        HTTP_POOL.max_idle_time = self.settings.get('connection_idle_timeout', 60)
+        HTTP_POOL.request_timeout = self.settings.get('request_timeout', 10)
+
+        # Offline, versions are only retrieved from the cache and the snapshot (see `CDNSnapshot`).
+        self.is_offline = self.settings.get('offline', False)
+
+        # Number of requests left untouched in the quota of rate-limited APIs.
+        self.rate_limit_reserve = self.settings.get('rate_limit_reserve', 0)
+
+        # CDN deferred by the last resolution (rate limit reached), and when to resume them.
+        self.deferred_cdn_content_list = []
+        self.resume_at = None
+        self._lock = Lock()
+
+    def resolve(self, cdn_content_list, on_resolved=None, is_prioritized=None):
+        """
+        Runs (concurrently) each distinct upstream lookup, and applies results to every CDN.
+        When an API rate limit is reached, remaining lookups are deferred : their CDN get a...
+        ... 'pending' status, and are returned (to be resolved again after `self.resume_at`).
+        `on_resolved` (if any) is called with the CDN of each lookup as soon as it's done...
+        ... (from worker threads), and lookups of CDN matching `is_prioritized` are run first.
+        Lookups not done in time (see `self.check_timeout`) are 'timed_out'.
+        Every CDN with a lookup is resolved, as results of a previous check are refreshed.
+        Once cancelled, CDN are left untouched (a newer check may have taken them over).
+        """
+        self.deadline = time.time() + self.check_timeout if self.check_timeout > 0 else None
+
+        groups = OrderedDict()
+        for cdn_content in cdn_content_list:
+            if cdn_content.lookup is not None:
+                groups.setdefault(cdn_content.lookup, []).append(cdn_content)
+
+        nb_cdn_contents = sum(len(group) for group in groups.values())
+        log_message(
+            "{0} lookups coalesced into {1} upstream requests ({2} saved).".format(
+                nb_cdn_contents,
+                len(groups),
+                nb_cdn_contents - len(groups)
+            )
+        )
+
+        def complete(lookup, latest_version):
+            """Applies the result of `lookup` to its CDN (as soon as it is known)"""
+            if latest_version is CANCELLED or self.is_cancelled():
+                return
+
+            if latest_version is DEFERRED:
+                self._defer(lookup, groups[lookup])
+            elif latest_version is TIMED_OUT:
+                for cdn_content in groups[lookup]:
+                    cdn_content.status = 'timed_out'
+            else:
+                for cdn_content in groups[lookup]:
+                    cdn_content.apply_latest_version(latest_version)
+
+            if on_resolved is not None:
+                on_resolved(groups[lookup])
+
+        pending_lookups = []
+        for lookup in groups:
+            latest_version = self._get_cached_version(lookup)
+            if latest_version is None and self.is_offline:
+                latest_version = SNAPSHOT.get(*lookup)
+
+            if latest_version is not None:
+                complete(lookup, latest_version)
+            else:
+                pending_lookups.append(lookup)
+
+        # Offline, no request is ever sent : libraries missing from the snapshot are not found.
+        if self.is_offline:
+            for lookup in pending_lookups:
+                log_message("\"{0}\" is missing from the snapshot ({1}).".format(
+                    lookup[1], lookup[0]
+                ))
+                complete(lookup, None)
+            pending_lookups = []
+
+        # Prioritized lookups (as the visible ones) are run first, then those shared by...
+        # ... most CDN, so they are the last ones to be deferred.
+        pending_lookups.sort(
+            key=lambda lookup: (
+                is_prioritized is not None and any(map(is_prioritized, groups[lookup])),
+                len(groups[lookup])
+            ),
+            reverse=True
+        )
+
+        # Upstream sources able to (as GitHub GraphQL API with a token) are resolved in batches.
+        results = self._fetch_batches(
+            [lookup for lookup in pending_lookups if UPSTREAMS[lookup[0]].can_batch()]
+        )
+        for lookup, latest_version in results.items():
+            complete(lookup, latest_version)
+        pending_lookups = [lookup for lookup in pending_lookups if lookup not in results]
+
+        self.pool.map(lambda lookup: complete(lookup, self._fetch(lookup)), pending_lookups)
+
+        nb_timed_out = sum(
+            cdn_content.status == 'timed_out'
+            for group in groups.values()
+            for cdn_content in group
+        )
+        if nb_timed_out:
+            log_message("{0} CDN timed out.".format(nb_timed_out))
+
+        if self.deferred_cdn_content_list:
+            log_message(
+                "{0} CDN deferred because of rate limits, until {1}.".format(
+                    len(self.deferred_cdn_content_list),
+                    time.strftime('%H:%M:%S', time.localtime(self.resume_at))
+                )
+            )
+
+        # Versions freshly retrieved are persisted for the next runs.
+        VERSION_CACHE.save()
+
+        return self.deferred_cdn_content_list
+
+    def _defer(self, lookup, group):
+        """Marks the CDN of `group` as 'pending', until the quota of `lookup` host is reset"""
+        upstream = UPSTREAMS[lookup[0]]
+        reset_at = RATE_LIMITS.get_reset_time(
+            upstream.get_host(), upstream.rate_limit_resource
+        ) or time.time()
+
+        # Lookups may be deferred concurrently, by different workers.
+        with self._lock:
+            for cdn_content in group:
+                cdn_content.status = 'pending'
+                self.deferred_cdn_content_list.append(cdn_content)
+
+            self.resume_at = max(self.resume_at or reset_at, reset_at)
+
+    def _get_interruption(self):
+        """Returns `CANCELLED` or `TIMED_OUT` if lookups must not be run anymore, else `None`"""
+        if self.is_cancelled():
+            return CANCELLED
+
+        if self.deadline is not None and time.time() >= self.deadline:
+            return TIMED_OUT
+
+        return None
+
+    def _get_cached_version(self, lookup):
+        """Returns the latest version of `lookup` from the cache, if it is fresh enough"""
+        provider, identity = lookup
+        if not UPSTREAMS[provider].cacheable:
+            return None
+
+        latest_version = VERSION_CACHE.get(
+            provider, identity,
+            self.settings.get('cache_ttl', 3600)
+        )
+        if latest_version is None:
+            self.metrics.record_cache('misses')
+            return None
+
+        self.metrics.record_cache('hits')
+        log_message("\"{0}\" has been found in cache ({1}).".format(identity, provider))
+
+        return latest_version
+
+    def _fetch(self, lookup):
+        """
+        Fetches upstream the latest version of `lookup`, and stores it for the next runs.
+        Returns `DEFERRED` if the quota of the upstream API does not allow it (anymore)...
+        ... `TIMED_OUT` if it could not be done in time, or `CANCELLED`.
+        """
+        provider, identity = lookup
+        interruption = self._get_interruption()
+        if interruption is not None:
+            return interruption
+
+        upstream = UPSTREAMS[provider]
+        if not RATE_LIMITS.try_acquire(upstream.get_host(), self.rate_limit_reserve,
+                                       upstream.rate_limit_resource):
+            return DEFERRED
+
+        try:
+            # Requests may not last beyond the deadline of this resolution (and are measured by it).
+            with HTTP_POOL.deadline(self.deadline), recording_into(self.metrics):
+                latest_version = upstream.fetch(identity)
+
+        except RateLimitError:
+            log_message("\"{0}\" has been deferred, rate limit reached ({1}).".format(
+                identity, provider
+            ))
+            return DEFERRED
+
+        except RequestTimeoutError:
+            log_message("\"{0}\" has timed out ({1}).".format(identity, provider))
+            return TIMED_OUT
+
+        except (URLError, ValueError, KeyError, TypeError) as error:
+            # Let's log an error there for the user (if `debug` is `true`).
+            # Unexpected answers (as an HTML page from a proxy) fail the lookup the same way...
+            # But we'll display a red icon anyway...
+            log_message(
+                "An error occurred for \"{0}\" ({1}).".format(
+                    identity, getattr(error, 'reason', error)
+                )
+            )
+            return None
+
+        if latest_version is not None and upstream.cacheable:
+            VERSION_CACHE.set(provider, identity, latest_version)
+
+        return latest_version
+
+    def _fetch_batches(self, lookups):
+        """
+        Fetches the latest versions of batchable `lookups`, in a few requests.
+        Lookups of a failed batch are missing from the result, and will be run one by one.
+        """
+        # Lookups are grouped by batch function (GitHub tags and releases share the same one).
+        lookups_by_batch_fetch = OrderedDict()
+        for lookup in lookups:
+            lookups_by_batch_fetch.setdefault(UPSTREAMS[lookup[0]].batch_fetch, []).append(lookup)
+
+        batch_size = self.settings.get('github_graphql_batch_size', 50)
+        batches = [
+            (batch_fetch, same_lookups[i:i + batch_size])
+            for batch_fetch, same_lookups in lookups_by_batch_fetch.items()
+            for i in range(0, len(same_lookups), batch_size)
+        ]
+
+        results = {}
+        for batch_results in self.pool.map(self._fetch_batch, batches):
+            results.update(batch_results)
+
+        for (provider, identity), latest_version in results.items():
+            if latest_version not in (None, DEFERRED, TIMED_OUT, CANCELLED) and \
+                    UPSTREAMS[provider].cacheable:
+                VERSION_CACHE.set(provider, identity, latest_version)
+
+        if batches:
+            log_message(
+                "{0} lookups resolved in {1} batch requests.".format(len(results), len(batches))
+            )
+        return results
+
+    def _fetch_batch(self, batch):
+        """
+        Runs one batch request (an error leads to an empty result).
+        Batches have their own quota : once exhausted, lookups are run one by one instead...
+        ... and only deferred if the quota of single lookups is exhausted as well.
+        """
+        batch_fetch, lookups = batch
+        interruption = self._get_interruption()
+        if interruption is not None:
+            return dict.fromkeys(lookups, interruption)
+
+        upstream = UPSTREAMS[lookups[0][0]]
+        if not RATE_LIMITS.try_acquire(upstream.get_host(), self.rate_limit_reserve,
+                                       upstream.batch_rate_limit_resource):
+            log_message("Batch requests rate limit reached, falling back to single lookups.")
+            return {}
+
+        try:
+            with HTTP_POOL.deadline(self.deadline), recording_into(self.metrics):
+                return batch_fetch(lookups)
+
+        except RateLimitError:
+            log_message("Batch requests rate limit reached, falling back to single lookups.")
+            return {}
+
+        except (URLError, ValueError, KeyError, TypeError) as error:
+            log_message(
+                "A batch request failed ({0}), falling back to single lookups.".format(
+                    getattr(error, 'reason', error)
+                )
+            )
+            return {}
+
+
+LOAD_TIMER.module_loaded(__name__)
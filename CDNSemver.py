@@ -0,0 +1,139 @@
+"""CDNUpdates' semantic versions engine (parsing, ordering and ranges)"""
+
+import re
+from functools import lru_cache
+
+from .CDNConstants import SEMVER_REGEXP_PATTERN
+from .CDNLoadTime import LOAD_TIMER
+
+
+# These regular expressions are lazily compiled.
+_SEMVER_REGEXP_OBJECT = None
+_VERSION_REGEXP_OBJECT = None
+_RANGE_REGEXP_OBJECT = None
+
+# Tags are looser than Semver : "3.2" or "4.9.0.1" have to be parsed as well.
+# Both patterns are anchored by `\Z` : `fullmatch()` is missing from Python 3.3 (Sublime Text 3).
+VERSION_REGEXP_PATTERN = (
+    r"v?(\d+(?:\.\d+)*)"
+    r"(?:-([\da-z-]+(?:\.[\da-z-]+)*))?"
+    r"(?:\+[\da-z-]+(?:\.[\da-z-]+)*)?"
+    r"\Z"
+)
+
+# jsDelivr ranges : "3", "3.2", "^3.2", "~3.2.1" (or an exact version, possibly a pre-release).
+RANGE_REGEXP_PATTERN = r"([\^~]?)v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([\da-z-]+(?:\.[\da-z-]+)*))?\Z"
+
+
+def search_semver(string):
+    """Returns the first semantic version found in `string`, or `None`"""
+    global _SEMVER_REGEXP_OBJECT  # pylint: disable=global-statement
+    if _SEMVER_REGEXP_OBJECT is None:
+        _SEMVER_REGEXP_OBJECT = re.compile(SEMVER_REGEXP_PATTERN, re.IGNORECASE)
+
+    match = _SEMVER_REGEXP_OBJECT.search(string)
+    return match and match.group(0)
+
+
+@lru_cache(maxsize=4096)
+def parse_version(version):
+    """
+    Returns a comparable key of `version` (or `None` if it can't be parsed).
+    Keys are tuples : (numbers, whether it is stable, pre-release identifiers)...
+    ... so "1.2" == "1.2.0" < "1.10.0-beta.2" < "1.10.0-beta.10" < "1.10.0".
+    Build metadata ("+...") is ignored, as Semver states.
+    """
+    global _VERSION_REGEXP_OBJECT  # pylint: disable=global-statement
+    if _VERSION_REGEXP_OBJECT is None:
+        _VERSION_REGEXP_OBJECT = re.compile(VERSION_REGEXP_PATTERN, re.IGNORECASE)
+
+    match = _VERSION_REGEXP_OBJECT.match(version.strip())
+    if match is None:
+        return None
+
+    numbers = tuple(int(number) for number in match.group(1).split('.'))
+    # Missing numbers are zeros ("3.2" is "3.2.0").
+    numbers += (0,) * (3 - len(numbers))
+
+    if match.group(2) is None:
+        return numbers, True, ()
+
+    # Numeric identifiers have a lower precedence than alphanumeric ones.
+    return numbers, False, tuple(
+        (0, int(identifier), '') if identifier.isdigit() else (1, 0, identifier)
+        for identifier in match.group(2).split('.')
+    )
+
+
+def get_latest_stable_version(versions):
+    """Returns the greatest stable version of `versions` (in a single pass), or `None`"""
+    latest_version, latest_key = None, None
+    for version in versions:
+        key = parse_version(version)
+        if key is None or not key[1]:
+            continue
+
+        if latest_key is None or key > latest_key:
+            latest_version, latest_key = version, key
+
+    return latest_version
+
+
+@lru_cache(maxsize=1024)
+def parse_range(version_range):
+    """
+    Returns the bounds of `version_range` (or `None` if it can't be parsed), as a tuple :
+    * the lowest version numbers included, and the lowest ones excluded ;
+    * or the key of the version, and `None` (for an exact version).
+    """
+    global _RANGE_REGEXP_OBJECT  # pylint: disable=global-statement
+    if _RANGE_REGEXP_OBJECT is None:
+        _RANGE_REGEXP_OBJECT = re.compile(RANGE_REGEXP_PATTERN, re.IGNORECASE)
+
+    match = _RANGE_REGEXP_OBJECT.match(version_range.strip())
+    if match is None:
+        return None
+
+    operator, prerelease = match.group(1), match.group(5)
+    numbers = [int(number) for number in match.group(2, 3, 4) if number is not None]
+
+    # A whole version (or a pre-release) is to be matched exactly.
+    if prerelease is not None or (not operator and len(numbers) == 3):
+        return parse_version(version_range.lstrip('^~')), None
+
+    # The last number given is the one which may not change ("3.2" means "3.2.x")...
+    bumped_index = len(numbers) - 1
+    if operator == '~':
+        # ... "~3.2.1" allows patches ("3.2.x"), "~3" minor versions ("3.x")...
+        bumped_index = min(bumped_index, 1)
+    elif operator == '^':
+        # ... and "^3.2" allows anything up to the next major version ("^0.2" : "0.2.x").
+        bumped_index = next(
+            (index for index, number in enumerate(numbers) if number), bumped_index
+        )
+
+    lower_numbers = tuple(numbers) + (0,) * (3 - len(numbers))
+    upper_numbers = tuple(numbers[:bumped_index]) + (numbers[bumped_index] + 1,)
+    upper_numbers += (0,) * (3 - len(upper_numbers))
+
+    return lower_numbers, upper_numbers
+
+
+def satisfies(version, version_range):
+    """
+    Whether `version` satisfies `version_range` (as jsDelivr resolves it).
+    Returns `None` if any of them can't be parsed.
+    """
+    key, bounds = parse_version(version), parse_range(version_range)
+    if key is None or bounds is None:
+        return None
+
+    lower, upper = bounds
+    if upper is None:
+        return key == lower
+
+    # As with NPM, ranges are only satisfied by stable versions.
+    return key[1] and lower <= key[0] < upper
+
+
+LOAD_TIMER.module_loaded(__name__)
@@ -0,0 +1,140 @@
+"""CDNUpdates' snapshot of upstream versions, for offline checks"""
+
+import json
+import os
+import time
+from threading import Lock
+
+from .CDNCache import VERSION_CACHE
+from .CDNContent import CDNContent
+from .CDNLoadTime import LOAD_TIMER
+from .CDNProviders import PROVIDERS_REGISTRY
+from .CDNUpstreams import fetch_cdnjs_index
+from .CDNUtils import get_cache_path, get_settings, log_message, read_json_file
+
+
+class Snapshot:
+    """
+    This class stores on disk (JSON) the latest versions of every known library...
+    ... so checks may be run offline (see the `offline` setting), without any request.
+    It's produced by `refresh_snapshot()`, and lazily loaded (as an index) on first lookup.
+    """
+
+    def __init__(self, file_name='snapshot.json'):
+        self.file_name = file_name
+
+        # "provider:identity" -> latest version
+        self._versions = None
+        self.created_at = None
+        self._lock = Lock()
+
+    @property
+    def file_path(self):
+        """Path to the snapshot file (`snapshot_path` setting, or within the cache directory)"""
+        return get_settings().get('snapshot_path') or \
+            os.path.join(get_cache_path(), self.file_name)
+
+    @staticmethod
+    def _key(provider, identity):
+        return "{0}:{1}".format(provider, identity)
+
+    def _load(self):
+        """Reads the snapshot file, if not already done (the lock must be held)"""
+        if self._versions is not None:
+            return
+
+        data = read_json_file(self.file_path, ('versions', 'created_at'))
+        if data is None:
+            log_message("No snapshot could be read from \"{0}\".".format(self.file_path))
+            data = {}, None
+
+        self._versions, self.created_at = data
+
+    def get(self, provider, identity):
+        """Returns the version of `identity` stored in the snapshot (or `None`)"""
+        with self._lock:
+            self._load()
+            return self._versions.get(self._key(provider, identity))
+
+    def update(self, versions):
+        """
+        Stores `versions` ((provider, identity) -> latest version) and writes the snapshot.
+        Libraries missing from `versions` keep their previous version.
+        """
+        with self._lock:
+            self._load()
+            self._versions.update(
+                (self._key(provider, identity), version)
+                for (provider, identity), version in versions.items()
+            )
+            self.created_at = time.time()
+
+            try:
+                os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+                with open(self.file_path, 'w', encoding='utf-8') as file:
+                    json.dump({'versions': self._versions, 'created_at': self.created_at}, file)
+            except OSError as error:
+                log_message("Could not write the snapshot file ({0}).".format(error))
+
+            return len(self._versions)
+
+
+# The snapshot is shared by every (offline) check.
+SNAPSHOT = Snapshot()
+
+
+def get_known_lookups():
+    """
+    Returns every lookup a snapshot should cover : libraries listed by the providers...
+    ... (correspondence tables), and libraries already looked up (NPM packages...).
+    """
+    lookups = set(VERSION_CACHE.get_lookups())
+    for provider in set(PROVIDERS_REGISTRY.values()):
+        lookups.update(provider.get_known_lookups())
+
+    return sorted(lookups)
+
+
+def refresh_snapshot():
+    """
+    Fetches upstream the latest version of every known library, and updates the snapshot.
+    Only versions actually retrieved are stored (the previous ones are kept for failed lookups).
+    Returns the number of versions retrieved, the number of lookups which failed (or have...
+    ... been deferred by a rate limit, or timed out), and the size of the snapshot.
+    """
+    from .CDNResolver import Resolver  # pylint: disable=import-outside-toplevel
+
+    versions = {}
+    lookups = get_known_lookups()
+
+    # The whole CDNJS catalog is downloaded at once.
+    cdnjs_versions = fetch_cdnjs_index()
+    if cdnjs_versions is not None:
+        versions.update(
+            (('cdnjs', name), version) for name, version in cdnjs_versions.items() if version
+        )
+        lookups = [lookup for lookup in lookups if lookup[0] != 'cdnjs']
+
+    cdn_content_list = []
+    for provider, identity in lookups:
+        cdn_content = CDNContent(None, None)
+        cdn_content.plan_lookup(provider, identity, '')
+        cdn_content_list.append(cdn_content)
+
+    # The snapshot itself is never used to refresh it (and it may take a while).
+    resolver = Resolver()
+    resolver.is_offline = False
+    resolver.check_timeout = 0
+    resolver.resolve(cdn_content_list)
+
+    nb_failures = 0
+    for cdn_content in cdn_content_list:
+        if cdn_content.status == 'pending' or cdn_content.latest_version is None:
+            nb_failures += 1
+        else:
+            versions[cdn_content.lookup] = cdn_content.latest_version
+
+    return len(versions), nb_failures, SNAPSHOT.update(versions)
+
+
+LOAD_TIMER.module_loaded(__name__)
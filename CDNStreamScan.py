@@ -0,0 +1,96 @@
+"""CDNUpdates' streaming links finder, for very large files"""
+
+import mmap
+import re
+
+from .CDNContent import CDNContent
+from .CDNLoadTime import LOAD_TIMER
+from .CDNProviders import get_provider, get_provider_link_pattern, parse_url
+
+
+# Files are matched by chunks of this size...
+CHUNK_SIZE = 16 * 1024 * 1024
+# ... extended by this overlap, so links crossing a chunk boundary are matched entirely.
+# Links longer than it are matched again from their beginning (see `iter_links`).
+CHUNK_OVERLAP = 64 * 1024
+
+# Newlines between two links are counted by slices of this size, not to copy the whole gap.
+NEWLINES_SLICE_SIZE = 1024 * 1024
+
+
+def count_newlines(mapping, start, end):
+    """Returns the number of newlines of `mapping` between `start` and `end` (slice by slice)"""
+    return sum(
+        mapping[slice_start:min(end, slice_start + NEWLINES_SLICE_SIZE)].count(b'\n')
+        for slice_start in range(start, end, NEWLINES_SLICE_SIZE)
+    )
+
+
+def iter_links(path, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Yields the (offset, line, column, url) tuples of the links served by known providers.
+    The file is memory-mapped and matched by overlapping chunks, so the memory footprint...
+    ... does not depend on its size. Lines are 1-based, columns are 1-based byte offsets.
+    `overlap` has to be longer than any link beginning (scheme and host) to be matched.
+    """
+    link_regexp_object = re.compile(get_provider_link_pattern().encode(), re.IGNORECASE)
+
+    with open(path, 'rb') as file:
+        try:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped (and don't contain any link).
+            return
+
+        with mapping:
+            size = len(mapping)
+            line, line_start, last_position = 1, 0, 0
+
+            # Matches are searched from the end of the previous one, as a same link...
+            # ... may be reachable from two consecutive chunks.
+            search_position = 0
+            for chunk_start in range(0, size, chunk_size):
+                chunk_end = min(size, chunk_start + chunk_size)
+                window_end = min(size, chunk_end + overlap)
+
+                for match in link_regexp_object.finditer(
+                        mapping, max(chunk_start, search_position), window_end):
+                    # Links starting in the overlap belong to the next chunk.
+                    if match.start() >= chunk_end:
+                        break
+
+                    # This link may have been truncated by the window, let's match it entirely.
+                    # It may also turn out not to be a provider link at all (host truncated).
+                    if match.end() == window_end and window_end < size:
+                        match = link_regexp_object.match(mapping, match.start())
+                        if match is None:
+                            continue
+
+                    search_position = match.end()
+
+                    # Line numbers are computed incrementally, chunk by chunk.
+                    if mapping.find(b'\n', last_position, match.start()) != -1:
+                        line += count_newlines(mapping, last_position, match.start())
+                        line_start = mapping.rfind(b'\n', last_position, match.start()) + 1
+                    last_position = match.start()
+
+                    yield (
+                        match.start(),
+                        line,
+                        match.start() - line_start + 1,
+                        match.group(0).decode('utf-8', errors='replace')
+                    )
+
+
+def iter_cdn_contents(path, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Yields `CDNContent` candidates (not checked yet) for the links found in `path`.
+    Their `sublime_region` is a (path, line, column) tuple.
+    """
+    for _, line, column, url in iter_links(path, chunk_size, overlap):
+        parsed_result = parse_url(url)
+        if get_provider(parsed_result.netloc) is not None:
+            yield CDNContent((path, line, column), parsed_result)
+
+
+LOAD_TIMER.module_loaded(__name__)
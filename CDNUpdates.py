@@ -1,12 +1,35 @@
 """CDNUpdates main class"""
 
-from sublime import error_message
-from sublime_plugin import EventListener, TextCommand
+from sublime import error_message, load_settings, set_timeout_async, status_message
+from sublime_plugin import ApplicationCommand, EventListener, TextCommand, WindowCommand
 
-from .CDNCheckForCDNProviders import CheckForCDNProviders
-from .CDNCheckForLinks import CheckForLinks
-from .CDNCheckForUpdates import CheckForUpdates
-from .CDNUtils import clear_view
+try:
+    # Sublime Text 4 reports where each buffer has been modified.
+    from sublime_plugin import TextChangeListener
+except ImportError:
+    TextChangeListener = None
+
+# Scanning, resolution and network modules are only imported when a command is run...
+# ... so most Sublime Text sessions (never checking any sheet) don't pay for them.
+from .CDNLoadTime import LOAD_TIMER
+from .CDNUtils import log_message
+from .CDNViewState import drop_view_state, get_view_state
+
+
+def plugin_loaded():
+    """Logs the loading time of the plugin (measured by `LOAD_TIMER`), and its budget"""
+    load_time = LOAD_TIMER.get_load_time()
+    startup_budget = load_settings('CDNUpdates.sublime-settings').get('startup_budget_ms', 50)
+
+    log_message("Plugin loaded in {0:.1f} ms (budget : {1} ms{2}), slowest modules : {3}.".format(
+        load_time,
+        startup_budget,
+        ", exceeded" if load_time > startup_budget else "",
+        ", ".join(
+            "{0} ({1:.1f} ms)".format(module_name, LOAD_TIMER.modules_load_times[module_name])
+            for module_name in LOAD_TIMER.get_slowest_modules()
+        )
+    ))
 
 
 class CDNUpdatesCommand(TextCommand):  # pylint: disable=too-few-public-methods
@@ -14,50 +37,202 @@ class CDNUpdatesCommand(TextCommand):  # pylint: disable=too-few-public-methods
     Entry point of CDNUpdates.
     The `run` method is called when the command is run.
     """
-    def __init__(self, view):
-        self.view = view
-
-        self.region_list = []
-        self.cdn_content_list = []
-
-    def run(self, _):
+    def run(self, _, is_automatic=False):
         """
         Main function, only handling statuses and calling other methods
+        `is_automatic` is set for checks run by `auto_check` (reported without any dialog).
         """
+        # pylint: disable=import-outside-toplevel
+        from .CDNCheckForCDNProviders import CheckForCDNProviders
+        from .CDNCheckForLinks import CheckForLinks
+        from .CDNCheckForUpdates import CheckForUpdates
+        from .CDNMetrics import METRICS
+
         # First we check if the current sheet is not still being loaded.
         if self.view.is_loading():
             error_message("This view is not fully loaded yet.")
             return
 
-        # If it's OK, we clear the view from the previously added elements.
-        clear_view(self.view)
+        # A newer check of this view cancels the previous one (if still running).
+        view_state = get_view_state(self.view)
+        generation = view_state.start_check()
+        METRICS.reset()
+
+        # Elements previously added are not cleared : they are updated as results arrive.
 
+        # When this view has already been scanned, only modified lines are scanned again.
+        split_result = None
+        dirty_regions = None
+        if view_state.is_scanned and \
+                load_settings('CDNUpdates.sublime-settings').get('incremental_scan', True):
+            dirty_regions = view_state.get_dirty_regions()
+            split_result = view_state.split_cdn_content_list(dirty_regions)
+
+        if split_result is None:
+            clean_cdn_content_list, pending_cdn_content_list = [], []
+            dirty_regions = None
+        else:
+            clean_cdn_content_list, pending_cdn_content_list = split_result
+
+        region_list = []
         self.view.set_status(
             'checking_link',
             "Checking this sheet for links..."
         )
-        CheckForLinks(self.view, self.region_list)
+        with METRICS.phase('links_scan'):
+            CheckForLinks(self.view, region_list, dirty_regions)
         self.view.erase_status('checking_link')
 
         self.view.set_status(
             'checking_cdn',
             "Checking for known CDN providers..."
         )
-        CheckForCDNProviders(self.view, self.cdn_content_list, self.region_list)
+        with METRICS.phase('providers_filter'):
+            CheckForCDNProviders(self.view, pending_cdn_content_list, region_list)
         self.view.erase_status('checking_cdn')
 
+        view_state.update(clean_cdn_content_list + pending_cdn_content_list)
+
         self.view.set_status(
             'checking_updates',
             "Checking for updates now..."
         )
         # This operation will run in another Thread not to "freeze" the worker.
-        CheckForUpdates(self.view, self.cdn_content_list).start()
+        CheckForUpdates(
+            self.view,
+            view_state.cdn_content_list,
+            pending_cdn_content_list,
+            lambda: view_state.is_superseded(generation),
+            is_automatic
+        ).start()
         self.view.erase_status('checking_updates')
 
 
+def schedule_auto_check(view):
+    """
+    If enabled, schedules an automatic check of `view` after a "debounce" delay.
+    Any event occurring in the meantime re-schedules it (only the last one will run).
+    """
+    settings = load_settings('CDNUpdates.sublime-settings')
+    if not settings.get('auto_check', False):
+        return
+
+    view_state = get_view_state(view)
+    view_state.auto_check_generation += 1
+    auto_check_generation = view_state.auto_check_generation
+
+    def auto_check():
+        if auto_check_generation == view_state.auto_check_generation and view.is_valid():
+            view.run_command('c_dNUpdates', {'is_automatic': True})
+
+    set_timeout_async(auto_check, settings.get('auto_check_delay', 1000))
+
+
+class CDNUpdatesClearCacheCommand(ApplicationCommand):  # pylint: disable=too-few-public-methods
+    """Drops every upstream version previously cached, so they are fetched again"""
+
+    def run(self):
+        """Invalidates the persistent cache"""
+        # pylint: disable=import-outside-toplevel
+        from .CDNCache import VERSION_CACHE
+        from .CDNUpstreams import CDNJS_INDEX
+
+        VERSION_CACHE.invalidate()
+        CDNJS_INDEX.invalidate()
+        status_message("CDNUpdates: cache has been cleared.")
+
+
+class CDNUpdatesRefreshSnapshotCommand(ApplicationCommand):  # pylint: disable=too-few-public-methods
+    """Fetches the latest version of every known library, to be used by offline checks"""
+
+    def run(self):
+        """Refreshes the snapshot in background"""
+        # pylint: disable=import-outside-toplevel
+        from .CDNSnapshot import refresh_snapshot
+        from .CDNWorkerPool import run_in_background
+
+        def refresh():
+            status_message("CDNUpdates: refreshing the snapshot of upstream versions...")
+            nb_versions, nb_failures, snapshot_size = refresh_snapshot()
+            status_message(
+                "CDNUpdates: snapshot refreshed ({0} versions retrieved, {1} failed, "
+                "{2} in the snapshot).".format(nb_versions, nb_failures, snapshot_size)
+            )
+
+        run_in_background(refresh)
+
+
+class CDNUpdatesProjectCommand(WindowCommand):  # pylint: disable=too-few-public-methods
+    """Checks every source file of the folders opened in the window (see `CDNProjectScan.py`)"""
+
+    def run(self):
+        """Starts the project scan in background"""
+        from .CDNProjectScan import scan_project  # pylint: disable=import-outside-toplevel
+
+        scan_project(self.window)
+
+
+class CDNUpdatesCancelProjectCommand(WindowCommand):  # pylint: disable=too-few-public-methods
+    """Cancels the project scan running for the window"""
+
+    def run(self):
+        """Cancels the project scan (if any)"""
+        from .CDNProjectScan import cancel_project_scan  # pylint: disable=import-outside-toplevel
+
+        cancel_project_scan(self.window)
+
+
 class CDNUpdatesListener(EventListener):  # pylint: disable=too-few-public-methods
     """Simple ST's listeners implementations"""
 
     def on_pre_save_async(self, view):  # pylint: disable=no-self-use
         """Just before file-saving, removes each CDNUpdates' object from the view"""
-        clear_view(view)
+        get_view_state(view).renderer.clear()
+
+    def on_load_async(self, view):
+        """When automatic checking is enabled, schedules a check of freshly opened sheets"""
+        schedule_auto_check(view)
+
+    def on_post_save_async(self, view):
+        """When automatic checking is enabled, schedules a check of freshly saved sheets"""
+        schedule_auto_check(view)
+
+    def on_modified_async(self, view):  # pylint: disable=no-self-use
+        """Without the exact ranges modified (Sublime Text 3), the next scan is a full one"""
+        if TextChangeListener is None:
+            get_view_state(view).invalidate()
+
+    def on_close(self, view):
+        """Forgets the scan state of closed views"""
+        drop_view_state(view)
+
+
+if TextChangeListener is not None:
+    class CDNUpdatesTextChangeListener(TextChangeListener):
+        """Keeps track of the ranges modified since the last scan (Sublime Text 4)"""
+
+        @classmethod
+        def is_applicable(cls, buffer):  # pylint: disable=unused-argument
+            """Every buffer is tracked"""
+            return True
+
+        def on_text_changed(self, changes):
+            """Marks the lines of `changes` as dirty, in every view of this buffer"""
+            changes = [
+                (change.a.pt, change.b.pt, len(change.str))
+                for change in changes
+            ]
+            for view in self.buffer.views():
+                get_view_state(view).mark_changes(changes)
+
+        def on_reload(self):
+            """A buffer reloaded from disk may have been modified anywhere"""
+            for view in self.buffer.views():
+                get_view_state(view).invalidate()
+
+        def on_revert(self):
+            """A reverted buffer may have been modified anywhere"""
+            self.on_reload()
+
+
+LOAD_TIMER.module_loaded(__name__)
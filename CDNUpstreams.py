@@ -0,0 +1,411 @@
+"""CDNUpdates' upstream version fetchers"""
+
+import json
+import re
+from urllib.error import URLError
+from urllib.parse import quote, urlsplit
+
+from .CDNCache import VERSION_CACHE
+from .CDNHttp import HTTP_POOL
+from .CDNLibraryIndex import LibraryIndex
+from .CDNLoadTime import LOAD_TIMER
+from .CDNMetrics import get_metrics
+from .CDNSemver import get_latest_stable_version, satisfies
+from .CDNUtils import get_settings, log_message
+
+
+# These are the base URLs of the upstream APIs.
+# They may be overridden with the `api_base_urls` setting (to use a mirror, or a mock server).
+API_BASE_URLS = {
+    'cdnjs': 'https://api.cdnjs.com',
+    'github': 'https://api.github.com',
+    'npm': 'https://registry.npmjs.org',
+    'wpsvn': 'https://plugins.svn.wordpress.org'
+}
+
+# Number of tags among which the latest (stable) version is picked (REST and GraphQL APIs).
+GITHUB_TAGS_COUNT = 100
+GITHUB_GRAPHQL_TAGS_COUNT = 20
+
+# GitHub counts requests to its REST and GraphQL APIs against distinct quotas (see `CDNRateLimits`).
+GITHUB_REST_RATE_LIMIT_RESOURCE = 'core'
+GITHUB_GRAPHQL_RATE_LIMIT_RESOURCE = 'graphql'
+
+# These are the GraphQL fields used to retrieve the latest tags (or release) of a repository.
+GITHUB_GRAPHQL_TAG_FIELD = (
+    '{alias}: repository(owner: {owner}, name: {name}) {{ '
+    'refs(refPrefix: "refs/tags/", first: {count}, '
+    'orderBy: {{field: TAG_COMMIT_DATE, direction: DESC}}) {{ nodes {{ name }} }} }}'
+)
+GITHUB_GRAPHQL_RELEASE_FIELD = (
+    '{alias}: repository(owner: {owner}, name: {name}) {{ latestRelease {{ tagName }} }}'
+)
+
+
+def _api_url(api, path):
+    """Returns the URL of `path` on the `api` upstream API"""
+    base_url = get_settings().get('api_base_urls', {}).get(api) or API_BASE_URLS[api]
+
+    return base_url.rstrip('/') + path
+
+
+def _log_unsuccessful_response(request):
+    """Logs (if `debug` is `true`) that `request` did not get a successful response"""
+    log_message(
+        "The HTTP response was not successful for \"{}\" ({}).".format(
+            request.geturl(),
+            request.getcode()
+        )
+    )
+
+
+def _github_headers():
+    """Returns the headers to pass to GitHub API (with the user token, if any)"""
+    github_api_token = get_settings().get('github_api_token')
+
+    return {
+        'Authorization': "token {}".format(github_api_token)
+    } if github_api_token else {}
+
+
+def _conditional_request(url, provider, identity, headers, rate_limit_resource=None):
+    """
+    Sends a request to `url`, conditioned by the validators stored for `identity` (if any).
+    Returns the response, and the previously cached version if it has not been modified.
+    """
+    entry = VERSION_CACHE.get_entry(provider, identity)
+    if entry is not None and entry['version'] is not None:
+        headers = dict(headers)
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    request = HTTP_POOL.request(url, headers=headers, rate_limit_resource=rate_limit_resource)
+
+    # `304 Not Modified` responses have no payload, and do not count against GitHub rate limit.
+    if request.getcode() == 304:
+        get_metrics().record_cache('revalidations')
+        log_message("\"{0}\" has not been modified upstream ({1}).".format(identity, provider))
+        return request, entry['version']
+
+    if request.getcode() == 200:
+        VERSION_CACHE.set_validators(
+            provider, identity,
+            request.headers.get('ETag'),
+            request.headers.get('Last-Modified')
+        )
+
+    return request, None
+
+
+def fetch_cdnjs_index():
+    """Returns the latest version of every library known by CDNJS' API (or `None`)"""
+    try:
+        request = HTTP_POOL.request(_api_url('cdnjs', '/libraries?fields=version'))
+    except URLError as error:
+        log_message("An error occurred while downloading CDNJS index ({0}).".format(error.reason))
+        return None
+
+    if request.getcode() != 200:
+        _log_unsuccessful_response(request)
+        return None
+
+    data = json.loads(request.read().decode())
+
+    return {result['name']: result.get('version') for result in data['results']}
+
+
+# The whole CDNJS catalog, only downloaded when the `cdnjs_index` setting is enabled.
+CDNJS_INDEX = LibraryIndex('cdnjs_index.json', fetch_cdnjs_index)
+
+
+def get_latest_tag(tags):
+    """
+    Returns the greatest stable version among `tags` (without any 'v' prefix)...
+    ... or the first one, if none of them looks like a version.
+    """
+    return (get_latest_stable_version(tags) or tags[0]).lstrip('v')
+
+
+def fetch_latest_cdnjs_version(name):
+    """Returns the latest version of `name` known by CDNJS' API (or `None`)"""
+    settings = get_settings()
+
+    # When enabled, the local index answers without any request...
+    # ... unless this library is more recent than it (it's then looked up on its own).
+    if settings.get('cdnjs_index', False):
+        versions = CDNJS_INDEX.get_versions(settings.get('cdnjs_index_ttl', 86400))
+        if versions and name in versions:
+            return versions[name]
+
+    # We ask CDNJS API to retrieve only the version of this library.
+    request, cached_version = _conditional_request(
+        _api_url('cdnjs', "/libraries/{name}?fields=version".format(
+            name=quote(name)
+        )),
+        'cdnjs', name,
+        {}
+    )
+
+    if cached_version is not None:
+        return cached_version
+
+    # If the request was not a success, we can't do anything.
+    if request.getcode() != 200:
+        _log_unsuccessful_response(request)
+        return None
+
+    # We fetch and decode the data from the payload.
+    return json.loads(request.read().decode()).get('version')
+
+
+def fetch_latest_github_tag(repository):
+    """Returns the latest tag of the `repository` ('owner/name') on GitHub (or `None`)"""
+    owner, name = repository.split('/', 1)
+    request, cached_version = _conditional_request(
+        _api_url('github', "/repos/{owner}/{name}/tags?per_page={count}".format(
+            owner=quote(owner),
+            name=quote(name),
+            count=GITHUB_TAGS_COUNT)),
+        'github_tag', repository,
+        _github_headers(),
+        GITHUB_REST_RATE_LIMIT_RESOURCE
+    )
+
+    if cached_version is not None:
+        return cached_version
+
+    if request.getcode() != 200:
+        _log_unsuccessful_response(request)
+        return None
+
+    data = json.loads(request.read().decode())
+    if not data:
+        # Should not be reached (GitHub issue or repository moved ?).
+        return None
+
+    return get_latest_tag([tag['name'] for tag in data])
+
+
+def fetch_latest_github_release(repository):
+    """Returns the latest release of the `repository` ('owner/name') on GitHub (or `None`)"""
+    owner, name = repository.split('/', 1)
+    request, cached_version = _conditional_request(
+        _api_url('github', '/repos/{owner}/{name}/releases/latest'.format(
+            owner=quote(owner),
+            name=quote(name)
+        )),
+        'github_release', repository,
+        _github_headers(),
+        GITHUB_REST_RATE_LIMIT_RESOURCE
+    )
+
+    if cached_version is not None:
+        return cached_version
+
+    if request.getcode() != 200:
+        _log_unsuccessful_response(request)
+        return None
+
+    data = json.loads(request.read().decode())
+
+    return data['tag_name'].lstrip('v')
+
+
+def fetch_latest_github_versions(lookups):
+    """
+    Resolves, in a single GraphQL query, the latest tags/releases of many GitHub repositories.
+    `lookups` is a list of ('github_tag' | 'github_release', 'owner/name') tuples.
+    Returns a dictionary mapping each lookup to its latest version (or `None` if not found).
+    This requires a GitHub API token, and is not conditional (the GraphQL API has no ETags).
+    """
+    fields = []
+    for index, (provider, repository) in enumerate(lookups):
+        owner, name = repository.split('/', 1)
+        fields.append(
+            (GITHUB_GRAPHQL_TAG_FIELD if provider == 'github_tag' else GITHUB_GRAPHQL_RELEASE_FIELD)
+            .format(
+                alias='l{0}'.format(index),
+                owner=json.dumps(owner), name=json.dumps(name),
+                count=GITHUB_GRAPHQL_TAGS_COUNT
+            )
+        )
+
+    request = HTTP_POOL.request(
+        _api_url('github', '/graphql'),
+        headers=dict(_github_headers(), **{'Content-Type': 'application/json'}),
+        data=json.dumps({'query': "query {{ {0} }}".format(' '.join(fields))}).encode(),
+        rate_limit_resource=GITHUB_GRAPHQL_RATE_LIMIT_RESOURCE
+    )
+
+    data = json.loads(request.read().decode()).get('data')
+    if not data:
+        # The query itself has been rejected, lookups will be run one by one.
+        _log_unsuccessful_response(request)
+        return {}
+
+    results = {}
+    for index, lookup in enumerate(lookups):
+        repository = data.get('l{0}'.format(index))
+        if not repository:
+            # Unknown (or moved) repository.
+            results[lookup] = None
+
+        elif lookup[0] == 'github_tag':
+            tags = repository['refs']['nodes']
+            results[lookup] = get_latest_tag([tag['name'] for tag in tags]) if tags else None
+
+        else:
+            release = repository['latestRelease']
+            results[lookup] = release['tagName'].lstrip('v') if release else None
+
+    return results
+
+
+def fetch_latest_npmjs_version(name):
+    """Returns the `latest` dist-tag of the `name` package on NPM registry (or `None`)"""
+    # Only the dist-tags of the package are requested (not its whole metadata).
+    # Scoped packages are requested as "@org%2Fpkg".
+    request, cached_version = _conditional_request(
+        _api_url('npm', "/-/package/{name}/dist-tags".format(name=quote(name, safe='@'))),
+        'npm', name,
+        {}
+    )
+
+    if cached_version is not None:
+        return cached_version
+
+    if request.getcode() != 200:
+        _log_unsuccessful_response(request)
+        return None
+
+    return json.loads(request.read().decode()).get('latest')
+
+
+def fetch_latest_wpsvn_tag(name):
+    """Parses HTML from WordPress' SVN plugin page to retrieve the latest tag (or `None`)"""
+    request = HTTP_POOL.request(
+        _api_url('wpsvn', "/{name}/tags/".format(
+            name=quote(name)
+        ))
+    )
+
+    if request.getcode() != 200:
+        _log_unsuccessful_response(request)
+        return None
+
+    # A f*cked-up one-liner to retrieve the latest version from SVN...
+    data = re.findall(
+        r"<li><a href=\".*\">(.*)<\/a><\/li>",
+        request.read().decode()
+    )
+    if not data:
+        return None
+
+    # Tags are listed in lexicographic order ("10.0" before "9.0"), the greatest one is picked.
+    tags = [tag.rstrip('/') for tag in data]
+    return get_latest_stable_version(tags) or tags[-1]
+
+
+def _is_github_batch_enabled():
+    """GraphQL batches require a GitHub API token (and may be disabled by the user)"""
+    settings = get_settings()
+
+    return bool(settings.get('github_api_token')) and settings.get('github_graphql_batch', True)
+
+
+def is_equal(latest_version, version, _):
+    """Versions are compared strictly"""
+    return latest_version == version
+
+
+def is_in_range(latest_version, version, _):
+    """
+    Versions are compared as jsDelivr ranges ('3.2.1' satisfies '3', '^3.1' or '~3.2.0')...
+    ... or "fuzzily" when they can't be parsed ('3.2.1' matches '3' or '3.2').
+    """
+    is_satisfied = satisfies(latest_version, version)
+    if is_satisfied is not None:
+        return is_satisfied
+
+    return latest_version.find(version, 0) == 0
+
+
+def is_github_up_to_date(latest_version, version, fuzzy_check):
+    """
+    Tags are compared strictly, or "fuzzily" as requested by the provider : as ranges...
+    ... or (case-insensitive) prefixes when they can't be parsed.
+    """
+    if not fuzzy_check:
+        return latest_version == version
+
+    is_satisfied = satisfies(latest_version, version)
+    if is_satisfied is not None:
+        return is_satisfied
+
+    return latest_version.lower().find(version.lower(), 0) == 0
+
+
+class Upstream:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """
+    An upstream source of latest versions (an API, a VCS...).
+    It declares how versions are fetched and compared, and its capabilities :
+    * `batch_fetch` resolves many identities at once (when `batch_enabled()` returns `True`) ;
+    * `cacheable` allows its results to be stored in `CDNCache.VERSION_CACHE` ;
+    * `api` (see `API_BASE_URLS`) tells which host is queried, so its rate limit is respected...
+      ... single lookups counting against its `rate_limit_resource` quota, and batches against...
+      ... its `batch_rate_limit_resource` one.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            fetch, compare,
+            batch_fetch=None, batch_enabled=None,
+            cacheable=True,
+            *, api=None, rate_limit_resource=None, batch_rate_limit_resource=None):
+        self.fetch = fetch
+        self.compare = compare
+        self.batch_fetch = batch_fetch
+        self.batch_enabled = batch_enabled
+        self.cacheable = cacheable
+        self.api = api
+        self.rate_limit_resource = rate_limit_resource
+        self.batch_rate_limit_resource = batch_rate_limit_resource
+
+    def get_host(self):
+        """Returns the host queried by this upstream (or `None` if unknown)"""
+        return urlsplit(_api_url(self.api, '')).netloc if self.api is not None else None
+
+    def can_batch(self):
+        """Whether lookups of this upstream may currently be resolved in batches"""
+        return self.batch_fetch is not None and \
+            (self.batch_enabled is None or self.batch_enabled())
+
+
+# This dictionary maps each kind of upstream lookup to the object handling it.
+# Additional upstream sources may be registered there (or from another module).
+UPSTREAMS = {
+    'cdnjs': Upstream(fetch_latest_cdnjs_version, is_equal, api='cdnjs'),
+    'github_tag': Upstream(
+        fetch_latest_github_tag, is_github_up_to_date,
+        batch_fetch=fetch_latest_github_versions,
+        batch_enabled=_is_github_batch_enabled,
+        api='github',
+        rate_limit_resource=GITHUB_REST_RATE_LIMIT_RESOURCE,
+        batch_rate_limit_resource=GITHUB_GRAPHQL_RATE_LIMIT_RESOURCE
+    ),
+    'github_release': Upstream(
+        fetch_latest_github_release, is_github_up_to_date,
+        batch_fetch=fetch_latest_github_versions,
+        batch_enabled=_is_github_batch_enabled,
+        api='github',
+        rate_limit_resource=GITHUB_REST_RATE_LIMIT_RESOURCE,
+        batch_rate_limit_resource=GITHUB_GRAPHQL_RATE_LIMIT_RESOURCE
+    ),
+    'npm': Upstream(fetch_latest_npmjs_version, is_in_range, api='npm'),
+    'wpsvn': Upstream(fetch_latest_wpsvn_tag, is_equal, api='wpsvn')
+}
+
+
+LOAD_TIMER.module_loaded(__name__)
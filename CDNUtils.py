@@ -1,6 +1,56 @@
 """CDNUpdates' utils module"""
 
-from sublime import active_window, load_settings
+import json
+import os
+import sys
+
+from .CDNLoadTime import LOAD_TIMER
+
+try:
+    import sublime
+except ImportError:
+    # CDNUpdates is being run outside of Sublime Text (see `CDNBatchScan`).
+    sublime = None
+
+
+class HeadlessSettings(dict):
+    """Settings used outside of Sublime Text, exposing the same `get` method"""
+
+
+# These settings are filled by the command-line entry point, when running headless.
+HEADLESS_SETTINGS = HeadlessSettings()
+
+
+def get_settings():
+    """Returns the settings of CDNUpdates (from Sublime Text, or the headless ones)"""
+    if sublime is None:
+        return HEADLESS_SETTINGS
+
+    return sublime.load_settings('CDNUpdates.sublime-settings')
+
+
+def get_cache_path():
+    """Returns the directory where CDNUpdates may store its cache files"""
+    if sublime is None:
+        return os.path.join(
+            os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+            'CDNUpdates'
+        )
+
+    return os.path.join(sublime.cache_path(), 'CDNUpdates')
+
+
+def read_json_file(path, keys):
+    """
+    Returns the values of `keys` in the JSON object stored at `path`...
+    ... or `None` if the file is missing, corrupted or lacks any of them.
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+        return tuple(data[key] for key in keys)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
 
 
 def clear_view(view):
@@ -10,6 +60,8 @@ def clear_view(view):
         view.erase_regions('up_to_date')
         view.erase_regions('to_update')
         view.erase_regions('not_found')
+        view.erase_regions('pending')
+        view.erase_regions('timed_out')
 
         # ... and our phantoms objects containing the latest versions...
         view.erase_phantoms('latest_versions')
@@ -19,11 +71,38 @@ def clear_view(view):
         view.erase_phantoms('specify_https')
 
 
+# The `debug` setting is cached (and refreshed when the settings change)...
+# ... as messages are logged from loops, where loading settings would be costly.
+_IS_DEBUG_ENABLED = None
+
+
+def _refresh_debug_setting():
+    global _IS_DEBUG_ENABLED  # pylint: disable=global-statement
+    _IS_DEBUG_ENABLED = bool(get_settings().get('debug', False))
+
+
+def is_debug_enabled():
+    """Returns whether `debug` is enabled in configuration"""
+    if sublime is None:
+        # Headless settings are a plain dictionary, cheap to read.
+        return bool(HEADLESS_SETTINGS.get('debug', False))
+
+    if _IS_DEBUG_ENABLED is None:
+        _refresh_debug_setting()
+        get_settings().add_on_change('cdn_updates_debug', _refresh_debug_setting)
+
+    return _IS_DEBUG_ENABLED
+
+
 def log_message(message):
     """When debug mode is enabled in configuration, logs the passed message in the console"""
-    if load_settings('CDNUpdates.sublime-settings').get('debug', False):
-        if active_window().active_panel() != 'console':
-            active_window().run_command(
+    if is_debug_enabled():
+        if sublime is None:
+            print("[DEBUG] CDNUpdates : {0}".format(message), file=sys.stderr)
+            return
+
+        if sublime.active_window().active_panel() != 'console':
+            sublime.active_window().run_command(
                 'show_panel',
                 {
                     'panel': 'console',
@@ -32,3 +111,6 @@ def log_message(message):
             )
 
         print("[DEBUG] CDNUpdates : {0}".format(message))
+
+
+LOAD_TIMER.module_loaded(__name__)
@@ -0,0 +1,174 @@
+"""CDNUpdates' per-view scan state"""
+
+from sublime import HIDDEN, Region
+
+from .CDNLoadTime import LOAD_TIMER
+from .CDNRenderer import ViewRenderer
+
+
+# These (hidden) regions are moved by Sublime Text itself as the buffer is modified.
+TRACKED_REGIONS_KEY = 'cdn_updates_tracked'
+DIRTY_REGIONS_KEY = 'cdn_updates_dirty'
+
+
+class ViewState:
+    """
+    This class keeps the result of the last scan of a view (CDN found, with their statuses).
+    Ranges modified since then are tracked, so only them have to be scanned again...
+    ... unless they could not be located : the whole view is scanned again then.
+    """
+
+    def __init__(self, view):
+        self.view = view
+
+        # Until a first full scan has been done, there is nothing to re-use.
+        self.is_scanned = False
+        self.cdn_content_list = []
+
+        # Elements drawn for these CDN, only updated where results change.
+        self.renderer = ViewRenderer(view)
+
+        # Incremented on each check (and each scheduled automatic check).
+        self.generation = 0
+        self.auto_check_generation = 0
+
+    def mark_changes(self, changes):
+        """
+        Marks as "dirty" the lines modified by `changes`, a list of (begin, end, length) tuples...
+        ... meaning `length` characters replaced the `begin`-`end` range (in order of occurrence).
+        As Sublime Text reports them, positions of a change are the ones before it was applied.
+        """
+        if not self.is_scanned:
+            return
+
+        # Ranges of the previous changes are moved (or merged) by the following ones.
+        changed_ranges = []
+        for begin, end, length in changes:
+            delta = length - (end - begin)
+
+            moved_ranges = []
+            for range_begin, range_end in changed_ranges:
+                if range_begin >= end:
+                    range_begin, range_end = range_begin + delta, range_end + delta
+                elif range_end > begin:
+                    range_begin = min(range_begin, begin)
+                    range_end = range_end + delta if range_end >= end else begin + length
+                moved_ranges.append((range_begin, range_end))
+
+            changed_ranges = moved_ranges + [(begin, begin + length)]
+
+        size = self.view.size()
+        dirty_regions = self.view.get_regions(DIRTY_REGIONS_KEY)
+        for range_begin, range_end in changed_ranges:
+            dirty_regions.append(self.view.full_line(
+                Region(min(range_begin, size), min(range_end, size))
+            ))
+
+        self.view.add_regions(DIRTY_REGIONS_KEY, dirty_regions, '', '', HIDDEN)
+
+    def invalidate(self):
+        """Forgets the last scan, when modifications could not be located (a full scan is next)"""
+        if not self.is_scanned:
+            return
+
+        self.is_scanned = False
+        self.cdn_content_list = []
+
+        self.view.erase_regions(TRACKED_REGIONS_KEY)
+        self.view.erase_regions(DIRTY_REGIONS_KEY)
+
+    def get_dirty_regions(self):
+        """Returns the (merged) full lines modified since the last scan"""
+        dirty_regions = []
+        for region in sorted(
+                self.view.get_regions(DIRTY_REGIONS_KEY),
+                key=lambda region: region.begin()):
+            region = self.view.full_line(region)
+            if dirty_regions and dirty_regions[-1].end() >= region.begin():
+                dirty_regions[-1] = dirty_regions[-1].cover(region)
+            else:
+                dirty_regions.append(region)
+
+        return dirty_regions
+
+    def split_cdn_content_list(self, dirty_regions):
+        """
+        Moves CDN of the last scan to their current regions, and returns a tuple of lists :
+        * CDN not located within `dirty_regions`, without any upstream lookup (already checked) ;
+        * CDN not located within `dirty_regions`, whose lookup has to be run (again) : their...
+          ... last result may be outdated (cache cleared, transient error, settings changed).
+        Others are dropped, as `dirty_regions` will have to be scanned again.
+        """
+        tracked_regions = self.view.get_regions(TRACKED_REGIONS_KEY)
+        if len(tracked_regions) != len(self.cdn_content_list):
+            # Should not happen, but if so, let's rescan everything.
+            return None
+
+        clean_cdn_content_list = []
+        unchecked_cdn_content_list = []
+        for cdn_content, region in zip(self.cdn_content_list, tracked_regions):
+            cdn_content.sublime_region = region
+
+            if region.empty() or any(region.intersects(dirty_region) or
+                                     dirty_region.contains(region)
+                                     for dirty_region in dirty_regions):
+                continue
+
+            if cdn_content.status in ('pending', 'timed_out'):
+                cdn_content.status = None
+
+            # Their last result is kept until the new one arrives (from the cache, usually).
+            if cdn_content.status is None or cdn_content.lookup is not None:
+                unchecked_cdn_content_list.append(cdn_content)
+            else:
+                clean_cdn_content_list.append(cdn_content)
+
+        return clean_cdn_content_list, unchecked_cdn_content_list
+
+    def start_check(self):
+        """Registers a new check of this view, superseding the previous ones"""
+        self.generation += 1
+        return self.generation
+
+    def is_superseded(self, generation):
+        """Whether the check `generation` has been superseded by a newer one"""
+        return generation != self.generation
+
+    def update(self, cdn_content_list):
+        """Stores the result of a scan, and starts tracking its regions"""
+        self.cdn_content_list = sorted(
+            cdn_content_list,
+            key=lambda cdn_content: cdn_content.sublime_region.begin()
+        )
+        self.is_scanned = True
+
+        self.view.add_regions(
+            TRACKED_REGIONS_KEY,
+            [cdn_content.sublime_region for cdn_content in self.cdn_content_list],
+            '', '', HIDDEN
+        )
+        self.view.erase_regions(DIRTY_REGIONS_KEY)
+
+
+# view.id() -> ViewState
+VIEW_STATES = {}
+
+
+def get_view_state(view):
+    """Returns the scan state of `view` (created on first call)"""
+    view_state = VIEW_STATES.get(view.id())
+    if view_state is None:
+        view_state = ViewState(view)
+        VIEW_STATES[view.id()] = view_state
+
+    return view_state
+
+
+def drop_view_state(view):
+    """Forgets the scan state of `view` (as when it's closed), cancelling its running checks"""
+    view_state = VIEW_STATES.pop(view.id(), None)
+    if view_state is not None:
+        view_state.start_check()
+
+
+LOAD_TIMER.module_loaded(__name__)
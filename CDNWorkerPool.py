@@ -0,0 +1,91 @@
+"""CDNUpdates' concurrent execution engine"""
+
+import traceback
+from threading import BoundedSemaphore, Lock
+
+from .CDNLoadTime import LOAD_TIMER
+
+
+class HostLimiter:
+    """
+    A simple registry of semaphores, one per remote host.
+    It caps the number of requests simultaneously sent to a same host.
+    """
+
+    def __init__(self, max_per_host=4):
+        self.max_per_host = max_per_host
+
+        self._semaphores = {}
+        self._lock = Lock()
+
+    def resize(self, max_per_host):
+        """Changes the per-host cap (semaphores are re-created lazily)"""
+        with self._lock:
+            if max_per_host != self.max_per_host:
+                self.max_per_host = max_per_host
+                self._semaphores.clear()
+
+    def slot(self, host):
+        """Returns the semaphore guarding `host`, to be used as a context manager"""
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = BoundedSemaphore(self.max_per_host)
+                self._semaphores[host] = semaphore
+
+            return semaphore
+
+
+# This limiter is shared by every lookup, whatever the worker pool running it.
+HOST_LIMITER = HostLimiter()
+
+
+class WorkerPool:  # pylint: disable=too-few-public-methods
+    """
+    This class runs jobs concurrently, with a global concurrency cap.
+    The per-host cap is enforced by `HOST_LIMITER` when requests are sent.
+    """
+
+    def __init__(self, max_workers=8, max_per_host=4):
+        self.max_workers = max(1, max_workers)
+
+        HOST_LIMITER.resize(max(1, max_per_host))
+
+    def map(self, function, items):
+        """Calls `function` on each element of `items`, and returns results in the same order"""
+        if not items:
+            return []
+
+        from concurrent.futures import ThreadPoolExecutor  # pylint: disable=import-outside-toplevel
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(function, items))
+
+
+# Checks are queued on a single worker, so several scans never run in parallel...
+# ... and project scans on another one, so they don't hold up checks of the current sheet.
+# Workers are only created on first use, not when Sublime Text loads the plugin.
+# worker name -> single-threaded executor
+_BACKGROUND_WORKERS = {}
+
+
+def _run_and_report(function):
+    """Calls `function`, printing its traceback (as a `Thread` would) if it raises"""
+    try:
+        function()
+    except Exception:  # pylint: disable=broad-except
+        traceback.print_exc()
+
+
+def run_in_background(function, worker_name='checks'):
+    """Queues `function` on the (single-threaded) background worker named `worker_name`"""
+    worker = _BACKGROUND_WORKERS.get(worker_name)
+    if worker is None:
+        from concurrent.futures import ThreadPoolExecutor  # pylint: disable=import-outside-toplevel
+        worker = ThreadPoolExecutor(max_workers=1)
+        _BACKGROUND_WORKERS[worker_name] = worker
+
+    return worker.submit(_run_and_report, function)
+
+
+LOAD_TIMER.module_loaded(__name__)
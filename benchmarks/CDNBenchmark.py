@@ -0,0 +1,172 @@
+"""
+CDNUpdates' benchmarks runner.
+
+For each corpus size, a sheet is generated (see `CDNCorpus`), scanned, and its CDN resolved...
+... against local mock servers (see `CDNMockServer`), with a cold cache.
+Wall time, requests issued and peak memory are reported for both phases.
+It has to be run as a module of the package, from the directory containing it :
+
+    $ python -m CDNUpdates.benchmarks.CDNBenchmark --sizes 10 100 1000 10000
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+from ..CDNBatchScan import get_cdn_contents, scan_file
+from ..CDNCache import VERSION_CACHE
+from ..CDNHttp import HTTP_POOL
+from ..CDNRateLimits import RATE_LIMITS
+from ..CDNResolver import Resolver
+from ..CDNUpstreams import CDNJS_INDEX
+from ..CDNUtils import HEADLESS_SETTINGS
+from .CDNCorpus import load_template_links, write_corpus
+from .CDNMockServer import UNKNOWN_MARKER, add_server_arguments, build_mock_apis
+
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+
+def _measure(function):
+    """
+    Calls `function` twice : once to measure its wall time, once (traced) for its peak memory.
+    `function` has to build its own state, so both calls do the same work.
+    Returns the result of the first call, its wall time (seconds) and peak memory (bytes).
+    """
+    started_at = time.perf_counter()
+    result = function()
+    wall_time = time.perf_counter() - started_at
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, wall_time, peak_memory
+
+
+def _build_cdn_content_list(path, links):
+    cdn_content_list = get_cdn_contents(path, links)
+    for cdn_content in cdn_content_list:
+        cdn_content.handle_provider()
+
+    return cdn_content_list
+
+
+def run_benchmark(path, mock_apis):
+    """Scans and resolves the sheet at `path`, and returns the measures of both phases"""
+    links, scan_time, scan_peak_memory = _measure(lambda: scan_file(path)[1])
+
+    # CDNJS catalog lists every (existing) library of the sheet.
+    mock_apis.set_cdnjs_libraries(
+        cdn_content.lookup[1] for cdn_content in _build_cdn_content_list(path, links)
+        if cdn_content.lookup is not None and cdn_content.lookup[0] == 'cdnjs'
+        and UNKNOWN_MARKER not in cdn_content.lookup[1]
+    )
+
+    def resolve():
+        # Every resolution starts cold : no cached version, no kept-alive connection...
+        # ... and fresh rate limits.
+        VERSION_CACHE.invalidate()
+        CDNJS_INDEX.invalidate()
+        HTTP_POOL.close()
+        RATE_LIMITS.clear()
+        mock_apis.reset()
+
+        cdn_content_list = _build_cdn_content_list(path, links)
+        Resolver().resolve(cdn_content_list)
+
+        return cdn_content_list, sum(mock_apis.requests.values())
+
+    (cdn_content_list, nb_requests), resolve_time, resolve_peak_memory = _measure(resolve)
+
+    return {
+        'links': len(links),
+        'scan_time': scan_time,
+        'scan_peak_memory': scan_peak_memory,
+        'resolve_time': resolve_time,
+        'resolve_peak_memory': resolve_peak_memory,
+        'requests': nb_requests,
+        'statuses': dict(Counter(cdn_content.status for cdn_content in cdn_content_list))
+    }
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        prog='python -m CDNUpdates.benchmarks.CDNBenchmark',
+        description="Benchmarks CDNUpdates scanning and resolution against mock APIs."
+    )
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+        help="numbers of links of the generated corpora"
+    )
+    parser.add_argument(
+        '--duplicated', action='store_true',
+        help="do not rename libraries of the copies of `testCases.html` links"
+    )
+    parser.add_argument(
+        '--graphql', action='store_true',
+        help="resolve GitHub repositories in batches (as with an API token)"
+    )
+    parser.add_argument(
+        '--cdnjs-index', action='store_true',
+        help="resolve CDNJS libraries from the whole catalog (downloaded once)"
+    )
+    parser.add_argument(
+        '--max-concurrent-lookups', type=int, default=8,
+        help="global cap of concurrent lookups"
+    )
+    parser.add_argument(
+        '--max-concurrent-lookups-per-host', type=int, default=4,
+        help="per-host cap of concurrent lookups"
+    )
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    mock_apis = build_mock_apis(args).start()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        # The cache of the user is not touched.
+        os.environ['XDG_CACHE_HOME'] = directory
+        HEADLESS_SETTINGS.update({
+            'api_base_urls': mock_apis.api_base_urls,
+            'github_api_token': 'benchmark' if args.graphql else '',
+            'cdnjs_index': args.cdnjs_index,
+            'max_concurrent_lookups': args.max_concurrent_lookups,
+            'max_concurrent_lookups_per_host': args.max_concurrent_lookups_per_host
+        })
+
+        template_links = load_template_links()
+        for size in args.sizes:
+            path = write_corpus(directory, size, not args.duplicated, template_links)
+            results.append(dict(run_benchmark(path, mock_apis), size=size))
+
+            if not args.json:
+                print(
+                    "{size:>6} links : scan {scan_time:8.3f} s ({scan_peak_memory:>9} B), "
+                    "resolve {resolve_time:8.3f} s ({resolve_peak_memory:>9} B), "
+                    "{requests:>5} requests, {statuses}".format(**results[-1])
+                )
+
+        HTTP_POOL.close()
+
+    mock_apis.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+CDNUpdates' benchmarks corpora.
+
+HTML sheets of any size are generated from the links of `tests/testCases.html`.
+When `distinct` is set, libraries of each copy of these links are renamed...
+... so upstream lookups can't all be coalesced (as in a real project).
+"""
+
+import os
+import re
+from urllib.parse import urlparse
+
+from ..CDNBatchScan import scan_file
+from ..CDNContent import CDNContent
+from ..CDNProviders import get_provider
+
+
+TEST_CASES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'tests', 'testCases.html'
+)
+
+
+def load_template_links(path=TEST_CASES_PATH):
+    """Returns the links served by known providers in `path`"""
+    return [url for _, _, url in scan_file(path)[1]]
+
+
+def _rename_library(url, suffix):
+    """Returns `url`, with the name of its library suffixed by `suffix` (if it can be found)"""
+    parsed_result = urlparse(url)
+    if get_provider(parsed_result.netloc) is None:
+        return url
+
+    cdn_content = CDNContent(None, parsed_result)
+    cdn_content.handle_provider()
+    if not cdn_content.name:
+        return url
+
+    # The name is only replaced when it's a whole path segment (or before a version).
+    return re.sub(
+        r'/{0}(?=[/@])'.format(re.escape(cdn_content.name)),
+        '/{0}-{1}'.format(cdn_content.name, suffix),
+        url,
+        count=1
+    )
+
+
+def generate_corpus(nb_links, distinct=True, template_links=None):
+    """Returns an HTML sheet containing `nb_links` links (based on `template_links`)"""
+    if template_links is None:
+        template_links = load_template_links()
+
+    lines = ['<!DOCTYPE html>', '<html>', '<head>']
+    for index in range(nb_links):
+        url = template_links[index % len(template_links)]
+
+        copy = index // len(template_links)
+        if distinct and copy:
+            url = _rename_library(url, copy)
+
+        lines.append('    <script src="{0}"></script>'.format(url))
+    lines.extend(['</head>', '</html>', ''])
+
+    return '\n'.join(lines)
+
+
+def write_corpus(directory, nb_links, distinct=True, template_links=None):
+    """Writes a corpus of `nb_links` links within `directory`, and returns its path"""
+    path = os.path.join(
+        directory,
+        'corpus-{0}{1}.html'.format(nb_links, '-distinct' if distinct else '')
+    )
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(generate_corpus(nb_links, distinct, template_links))
+
+    return path
@@ -0,0 +1,429 @@
+"""
+CDNUpdates' benchmarks mock server.
+
+It emulates the upstream APIs queried by `CDNUpstreams` (GitHub, CDNJS, NPM registry and...
+... WordPress SVN) with a configurable latency, error rate and rate limitation, so benchmarks...
+... are reproducible.
+As the real ones, each API is served by its own server (see `MockAPIs`), under its own prefix.
+They may also be run on their own, and set as `api_base_urls` in the plugin settings :
+
+    $ python -m CDNUpdates.benchmarks.CDNMockServer --port 8080 --latency 0.1
+"""
+
+import hashlib
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+# Libraries whose name contains this marker are unknown to every API (as in `testCases.html`).
+UNKNOWN_MARKER = 'does_not_exist'
+
+# The APIs emulated by this server (same identifiers as `CDNUpstreams.API_BASE_URLS`).
+APIS = ('cdnjs', 'github', 'npm', 'wpsvn')
+
+GITHUB_GRAPHQL_FIELD_REGEXP_OBJECT = re.compile(
+    r'(l\d+): repository\(owner: ("(?:[^"\\]|\\.)*"), name: ("(?:[^"\\]|\\.)*")\) '
+    r'\{ (refs|latestRelease)'
+)
+
+
+def fake_version(identity):
+    """Returns a deterministic (fake) latest version for `identity`"""
+    digest = hashlib.md5(identity.encode()).digest()
+    return "{0}.{1}.{2}".format(digest[0] % 10, digest[1] % 20, digest[2] % 30)
+
+
+def fake_tags(identity):
+    """Returns a few (fake) tags of `identity`, the latest one being `fake_version(identity)`"""
+    major, minor, patch = fake_version(identity).split('.')
+    return [
+        "{0}.{1}.{2}".format(major, minor, int(patch) - offset)
+        for offset in (2, 1, 0)
+        if int(patch) - offset >= 0
+    ]
+
+
+class MockAPIServer(ThreadingHTTPServer):  # pylint: disable=too-many-instance-attributes
+    """
+    A threaded HTTP server emulating the upstream APIs.
+    * `latency` (and `jitter`) is the time (in seconds) spent before answering each request ;
+    * `error_rate` is the probability of answering with a server error ;
+    * `rate_limit` is the number of requests GitHub API accepts during `rate_limit_window`...
+      ... seconds (`None` disables it), as advertised by its `X-RateLimit-*` headers ;
+    * `cdnjs_libraries` are the libraries listed by CDNJS catalog (empty by default).
+    Random draws are seeded, so a same scenario always leads to the same errors.
+    """
+
+    daemon_threads = True
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            address=('127.0.0.1', 0),
+            *,
+            latency=0.0, jitter=0.0,
+            error_rate=0.0,
+            rate_limit=None, rate_limit_window=60,
+            seed=0):
+        super().__init__(address, MockAPIRequestHandler)
+
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+
+        self._random = random.Random(seed)
+        self._lock = Lock()
+        self._thread = None
+
+        self.requests = Counter()
+        # Libraries listed in CDNJS catalog (others are only known by exact lookups).
+        self.cdnjs_libraries = set()
+        self._rate_limit_remaining = rate_limit
+        self._rate_limit_reset = time.time() + rate_limit_window
+
+    @property
+    def base_url(self):
+        """Root URL of this server"""
+        return "http://{0}:{1}".format(*self.server_address[:2])
+
+    @property
+    def api_base_urls(self):
+        """Base URL of each emulated API, to be used as `api_base_urls` setting"""
+        return {api: "{0}/{1}".format(self.base_url, api) for api in APIS}
+
+    def start(self):
+        """Serves requests in a background thread"""
+        self._thread = Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving requests, and closes the socket"""
+        self.shutdown()
+        self.server_close()
+
+    def reset(self):
+        """Resets requests counters (and rate limitation)"""
+        with self._lock:
+            self.requests.clear()
+            self._rate_limit_remaining = self.rate_limit
+            self._rate_limit_reset = time.time() + self.rate_limit_window
+
+    def register_request(self, api):
+        """Counts a request to `api`, and returns the delay to wait before answering it"""
+        with self._lock:
+            self.requests[api] += 1
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def draw_error(self):
+        """Whether the current request should fail (according to `error_rate`)"""
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def consume_rate_limit(self):
+        """
+        Consumes one request from GitHub rate limit.
+        Returns the `X-RateLimit-*` headers, and whether the limit has been exceeded.
+        """
+        if self.rate_limit is None:
+            return {}, False
+
+        with self._lock:
+            now = time.time()
+            if now >= self._rate_limit_reset:
+                self._rate_limit_remaining = self.rate_limit
+                self._rate_limit_reset = now + self.rate_limit_window
+
+            exceeded = self._rate_limit_remaining <= 0
+            if not exceeded:
+                self._rate_limit_remaining -= 1
+
+            headers = {
+                'X-RateLimit-Limit': str(self.rate_limit),
+                'X-RateLimit-Remaining': str(self._rate_limit_remaining),
+                'X-RateLimit-Reset': str(int(self._rate_limit_reset))
+            }
+            if exceeded:
+                headers['Retry-After'] = str(int(self._rate_limit_reset - now) + 1)
+
+            return headers, exceeded
+
+
+class MockAPIRequestHandler(BaseHTTPRequestHandler):
+    """Routes requests to the emulated API endpoints"""
+
+    # Connections are kept alive, as with the real APIs.
+    protocol_version = 'HTTP/1.1'
+    # Headers and payload are written separately, they must not wait for a delayed ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *_):  # pylint: disable=arguments-differ
+        """Requests are counted by the server, not logged"""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handles GET requests"""
+        self._handle(None)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handles POST requests (GitHub GraphQL API)"""
+        self._handle(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+
+    def _handle(self, body):
+        parts = urlsplit(self.path)
+        api, _, path = parts.path.lstrip('/').partition('/')
+        query = parse_qs(parts.query)
+
+        time.sleep(self.server.register_request(api))
+
+        headers = {}
+        if api == 'github':
+            headers, exceeded = self.server.consume_rate_limit()
+            if exceeded:
+                self._respond(403, {'message': "API rate limit exceeded"}, headers)
+                return
+
+        if self.server.draw_error():
+            self._respond(503, {'message': "Service unavailable"}, headers)
+            return
+
+        route = {
+            'cdnjs': self._cdnjs,
+            'github': self._github,
+            'npm': self._npm,
+            'wpsvn': self._wpsvn
+        }.get(api)
+        if route is None:
+            self._respond(404, {'message': "Not found"}, headers)
+            return
+
+        status, payload = route(path, query, body)
+        self._respond(status, payload, headers)
+
+    def _respond(self, status, payload, headers):
+        """Sends `payload` (JSON, or HTML if it's a string), honoring `If-None-Match`"""
+        if isinstance(payload, str):
+            content_type, data = 'text/html; charset=UTF-8', payload.encode()
+        else:
+            content_type, data = 'application/json; charset=utf-8', json.dumps(payload).encode()
+
+        etag = '"{0}"'.format(hashlib.md5(data).hexdigest())
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            status, data = 304, b''
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status in (200, 304):
+            self.send_header('ETag', etag)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _cdnjs(self, path, *_):
+        # <https://api.cdnjs.com/libraries/{name}?fields=version>
+        match = re.match(r'libraries/([^/]+)$', path)
+        if match:
+            name = unquote(match.group(1))
+            if UNKNOWN_MARKER in name:
+                return 404, {'error': True, 'status': 404, 'message': "Library not found"}
+
+            return 200, {'version': fake_version(name)}
+
+        # <https://api.cdnjs.com/libraries?fields=version> (the whole catalog)
+        if path == 'libraries':
+            return 200, {
+                'results': [
+                    {'name': name, 'version': fake_version(name)}
+                    for name in sorted(self.server.cdnjs_libraries)
+                ],
+                'total': len(self.server.cdnjs_libraries)
+            }
+
+        return 404, {'error': True, 'status': 404, 'message': "Not found"}
+
+    @staticmethod
+    def _github(path, _, body):
+        # <https://api.github.com/repos/{owner}/{name}/(tags|releases/latest)>
+        match = re.match(r'repos/([^/]+)/([^/]+)/(tags|releases/latest)$', path)
+        if match:
+            repository = "{0}/{1}".format(unquote(match.group(1)), unquote(match.group(2)))
+            if UNKNOWN_MARKER in repository:
+                return 404, {'message': "Not Found"}
+
+            if match.group(3) == 'tags':
+                return 200, [{'name': 'v' + tag} for tag in reversed(fake_tags(repository))]
+
+            return 200, {'tag_name': 'v' + fake_version(repository)}
+
+        # <https://api.github.com/graphql>
+        if path == 'graphql' and body is not None:
+            query = json.loads(body.decode()).get('query', '')
+
+            data = {}
+            for alias, owner, name, field in GITHUB_GRAPHQL_FIELD_REGEXP_OBJECT.findall(query):
+                repository = "{0}/{1}".format(json.loads(owner), json.loads(name))
+                if UNKNOWN_MARKER in repository:
+                    data[alias] = None
+                elif field == 'refs':
+                    data[alias] = {'refs': {'nodes': [{'name': 'v' + fake_version(repository)}]}}
+                else:
+                    data[alias] = {'latestRelease': {'tagName': 'v' + fake_version(repository)}}
+
+            return 200, {'data': data}
+
+        return 404, {'message': "Not Found"}
+
+    @staticmethod
+    def _npm(path, *_):
+        # <https://registry.npmjs.org/-/package/{name}/dist-tags> (scoped as "@org%2Fpkg")
+        match = re.match(r'-/package/(.+)/dist-tags$', path)
+        if not match or UNKNOWN_MARKER in match.group(1):
+            return 404, {'error': "Not found"}
+
+        return 200, {'latest': fake_version(unquote(match.group(1)))}
+
+    @staticmethod
+    def _wpsvn(path, *_):
+        # <https://plugins.svn.wordpress.org/{name}/tags/>
+        match = re.match(r'([^/]+)/tags/$', path)
+        if not match or UNKNOWN_MARKER in match.group(1):
+            return 404, "<html><body>Not Found</body></html>"
+
+        return 200, "<html><body><ul>\n{0}\n</ul></body></html>".format('\n'.join(
+            '<li><a href="{0}/">{0}/</a></li>'.format(tag)
+            for tag in fake_tags(unquote(match.group(1)))
+        ))
+
+
+class MockAPIs:
+    """
+    A set of mock servers, one per API (listening on consecutive ports, if `port` is set).
+    As they run on distinct hosts, rate limits and per-host caps apply to each API separately.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, seed=0, **options):
+        self.servers = {
+            api: MockAPIServer(
+                (host, port + index if port else 0),
+                seed=seed + index,
+                **options
+            )
+            for index, api in enumerate(APIS)
+        }
+
+    @property
+    def api_base_urls(self):
+        """Base URL of each emulated API, to be used as `api_base_urls` setting"""
+        return {
+            api: "{0}/{1}".format(server.base_url, api)
+            for api, server in self.servers.items()
+        }
+
+    @property
+    def requests(self):
+        """Number of requests received, by API"""
+        requests = Counter()
+        for server in self.servers.values():
+            requests.update(server.requests)
+
+        return requests
+
+    def start(self):
+        """Serves requests of every API in background threads"""
+        for server in self.servers.values():
+            server.start()
+
+        return self
+
+    def stop(self):
+        """Stops every server"""
+        for server in self.servers.values():
+            server.stop()
+
+    def set_cdnjs_libraries(self, names):
+        """Sets the libraries listed by CDNJS catalog"""
+        self.servers['cdnjs'].cdnjs_libraries = set(names)
+
+    def reset(self):
+        """Resets requests counters (and rate limitations) of every server"""
+        for server in self.servers.values():
+            server.reset()
+
+
+def main(argv=None):
+    """Command-line entry point, serving the mock APIs until interrupted"""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        prog='python -m CDNUpdates.benchmarks.CDNMockServer',
+        description="Serves mock upstream APIs for CDNUpdates."
+    )
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument(
+        '--port', type=int, default=8080,
+        help="port of the first API (others listen on the following ones)"
+    )
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    mock_apis = build_mock_apis(args, args.host, args.port).start()
+    print(
+        "Set `api_base_urls` to {0}".format(json.dumps(mock_apis.api_base_urls)),
+        file=sys.stderr
+    )
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock_apis.stop()
+
+    return 0
+
+
+def add_server_arguments(parser):
+    """Adds the mock server options to `parser` (shared with the benchmarks runner)"""
+    parser.add_argument(
+        '--latency', type=float, default=0.05,
+        help="seconds spent before answering each request"
+    )
+    parser.add_argument(
+        '--jitter', type=float, default=0.0,
+        help="maximum random deviation (in seconds) from the latency"
+    )
+    parser.add_argument(
+        '--error-rate', type=float, default=0.0,
+        help="probability (0 to 1) of answering with a server error"
+    )
+    parser.add_argument(
+        '--rate-limit', type=int,
+        help="number of GitHub requests accepted per window (unlimited by default)"
+    )
+    parser.add_argument(
+        '--rate-limit-window', type=int, default=60,
+        help="duration (in seconds) of GitHub rate limit window"
+    )
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random draws")
+
+
+def build_mock_apis(args, host='127.0.0.1', port=0):
+    """Returns mock servers configured from parsed `args` (see `add_server_arguments`)"""
+    return MockAPIs(
+        host, port,
+        latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit, rate_limit_window=args.rate_limit_window,
+        seed=args.seed
+    )
+
+
+if __name__ == '__main__':
+    sys.exit(main())